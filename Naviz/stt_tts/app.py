@@ -1,5 +1,8 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, JSONResponse
+import time
+_MODULE_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import io
 import os
@@ -7,7 +10,20 @@ import uuid
 import tempfile
 import logging
 import re
-from typing import Optional, Dict, Any
+import sys
+import math
+import bisect
+import contextlib
+import importlib
+import importlib.util
+import json
+import wave
+import struct
+import hashlib
+import subprocess
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set, Tuple
 
 # Security utility function
 def sanitize_for_log(input_str: str) -> str:
@@ -16,31 +32,52 @@ def sanitize_for_log(input_str: str) -> str:
         input_str = str(input_str)
     # Remove newlines and limit length
     return re.sub(r'[\r\n\t]', '_', input_str)[:200]
-import torch
-from pydub import AudioSegment
 import soundfile as sf
 import numpy as np
 from pathlib import Path
-import librosa
-import noisereduce as nr
-from scipy import signal
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-
-# Import Whisper for STT
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+import functools
+import itertools
+import queue
+import threading
+import multiprocessing
+import concurrent.futures
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Lazy heavy imports
+#
+# torch, Whisper, Coqui TTS and scipy.signal take seconds to import,
+# so each is imported on first use by the code path that needs it and the time
+# spent is recorded in IMPORT_TIMINGS. Availability is probed with find_spec,
+# which locates a package without executing it.
+
+IMPORT_TIMINGS: Dict[str, float] = {}
+_import_locks: Dict[str, threading.Lock] = {}
+
+def lazy_import(module_name: str):
+    """Import a module on first use and record how long the import took.
+
+    Always goes through importlib.import_module: while another thread is still
+    executing a module, sys.modules already holds it half initialised.
+    """
+    with _import_locks.setdefault(module_name, threading.Lock()):
+        if module_name in sys.modules:
+            return importlib.import_module(module_name)
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        IMPORT_TIMINGS[module_name] = time.perf_counter() - started
+    logger.info(f"Imported {module_name} in {IMPORT_TIMINGS[module_name]:.2f}s")
+    return module
+
+# Check Whisper for STT
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
+if not WHISPER_AVAILABLE:
     print("Warning: Whisper not available. Install with: pip install openai-whisper")
 
-# Import Coqui TTS
-try:
-    from TTS.api import TTS
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
+# Check Coqui TTS
+TTS_AVAILABLE = importlib.util.find_spec("TTS") is not None
+if not TTS_AVAILABLE:
     print("Warning: Coqui TTS not available. Install with: pip install coqui-tts")
 
 # Import gTTS
@@ -86,8 +123,292 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global models cache
-models_cache = {}
+# In-process metrics
+#
+# Counters, gauges and histograms keyed by label values. Updates are a dict
+# lookup plus a few additions under a lock, cheap enough for hot paths. GET
+# /metrics renders them in the Prometheus text format; /stats returns the same
+# data as JSON.
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        METRICS[name] = self
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self._values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "buckets": dict(zip([*map(str, self.buckets), "+Inf"], itertools.accumulate(counts))),
+                    "count": count,
+                    "sum": total,
+                }
+                for key, (counts, count, total) in self._values.items()
+            ]
+
+METRICS: Dict[str, Metric] = {}
+
+def metrics_snapshot() -> Dict[str, Any]:
+    return {name: {"type": metric.kind, "values": metric.snapshot()} for name, metric in METRICS.items()}
+
+def _prometheus_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _prometheus_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _prometheus_labels(labels: Dict[str, Any], **extra: str) -> str:
+    # Empty label values mean "not applicable" and are left out, as Prometheus treats them the same
+    pairs = [f'{name}="{_prometheus_escape(str(value))}"' for name, value in {**labels, **extra}.items() if value != ""]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format, version 0.0.4."""
+    lines = []
+    for name, metric in list(METRICS.items()):
+        help_text = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for sample in metric.snapshot():
+            labels = sample["labels"]
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_prometheus_labels(labels)} {_prometheus_value(sample['value'])}")
+                continue
+            for bound, count in sample["buckets"].items():
+                lines.append(f"{name}_bucket{_prometheus_labels(labels, le=bound)} {count}")
+            lines.append(f"{name}_sum{_prometheus_labels(labels)} {_prometheus_value(sample['sum'])}")
+            lines.append(f"{name}_count{_prometheus_labels(labels)} {sample['count']}")
+    return "\n".join(lines) + "\n"
+
+# Per-stage timings
+#
+# Every stage of a request records its wall time in one histogram, labelled with
+# the language, backend and Whisper model size where they apply. Stages:
+# decode, resample, denoise, detect, model_load, transcribe, tts_synthesis and
+# encode. Work done in other processes (Whisper workers, the inference process
+# pool) is timed by the awaiting caller, so it includes the wait for a worker.
+# When one pass detects and transcribes a clip, the detection share is measured
+# beside the model and returned with the result for the caller to record.
+
+stage_seconds = Histogram(
+    "stage_duration_seconds", "Wall time of one processing stage",
+    ("stage", "language", "backend", "model_size"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+@contextlib.contextmanager
+def time_stage(stage: str, **labels):
+    """Record the wall time of the enclosed block if it completes without raising."""
+    started = time.perf_counter()
+    yield
+    stage_seconds.observe(time.perf_counter() - started, stage=stage, **labels)
+
+# Model registry
+#
+# Replaces a bare dict of loaded models. Concurrent first requests for a key
+# share one load, least recently used models are evicted once the resident
+# total exceeds MODEL_MEMORY_BUDGET_MB (0 disables eviction), and pinned models
+# are never evicted.
+
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+MODEL_PINNED = [key.strip() for key in os.getenv("MODEL_PINNED", "").split(",") if key.strip()]
+
+model_resident_bytes = Gauge("model_resident_bytes", "Estimated memory held by a loaded model", ("model",))
+model_loads_total = Counter("model_loads_total", "Model loads by outcome", ("model", "outcome"))
+model_evictions_total = Counter("model_evictions_total", "Models evicted to stay within the memory budget", ("model",))
+model_cache_requests_total = Counter("model_cache_requests_total", "Model registry lookups by result", ("result",))
+
+def estimate_model_size(model: Any) -> int:
+    """Bytes held by a model's torch parameters and buffers."""
+    if not hasattr(model, "parameters"):
+        # Coqui keeps its torch modules on the synthesizer
+        model = getattr(model, "synthesizer", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    tensors = itertools.chain(model.parameters(), model.buffers() if hasattr(model, "buffers") else ())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+class ModelEntry:
+    def __init__(self, model: Any, size_bytes: int):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+class ModelRegistry:
+    """Thread-safe, memory-bounded cache of loaded models with single-flight loading."""
+
+    def __init__(self, memory_budget_bytes: int = 0, pinned: Optional[List[str]] = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._pinned = set(pinned or [])
+        self._entries: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._loading: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, loader) -> Any:
+        """Return the model for key, calling loader at most once across concurrent callers."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                entry.last_used = time.time()
+                model_cache_requests_total.inc(result="hit")
+                return entry.model
+            model_cache_requests_total.inc(result="miss")
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = concurrent.futures.Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            model = loader()
+        except BaseException as e:
+            model_loads_total.inc(model=key, outcome="error")
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        model_loads_total.inc(model=key, outcome="loaded")
+        self.register(key, model)
+        with self._lock:
+            del self._loading[key]
+        future.set_result(model)
+        return model
+
+    def register(self, key: str, model: Any, pinned: bool = False):
+        """Insert an already loaded model, evicting others if over budget."""
+        entry = ModelEntry(model, estimate_model_size(model))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if pinned:
+                self._pinned.add(key)
+            evicted = self._evict_locked(keep=key)
+        model_resident_bytes.set(entry.size_bytes, model=key)
+        for evicted_key in evicted:
+            logger.info(f"Evicted model {evicted_key} to stay within the {self.memory_budget_bytes} byte budget")
+
+    def _evict_locked(self, keep: str) -> List[str]:
+        evicted = []
+        if self.memory_budget_bytes <= 0:
+            return evicted
+        resident = sum(entry.size_bytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if resident <= self.memory_budget_bytes:
+                break
+            if key == keep or key in self._pinned:
+                continue
+            resident -= self._entries.pop(key).size_bytes
+            model_resident_bytes.remove(model=key)
+            model_evictions_total.inc(model=key)
+            evicted.append(key)
+        return evicted
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            model_resident_bytes.remove(model=key)
+        return entry is not None
+
+    def pin(self, key: str):
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key: str):
+        with self._lock:
+            self._pinned.discard(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [
+                {
+                    "key": key,
+                    "size_bytes": entry.size_bytes,
+                    "pinned": key in self._pinned,
+                    "hits": entry.hits,
+                    "loaded_at": entry.loaded_at,
+                    "last_used": entry.last_used,
+                }
+                for key, entry in self._entries.items()
+            ]
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": sum(model["size_bytes"] for model in models),
+            "models": models,
+        }
+
+model_registry = ModelRegistry(int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024), MODEL_PINNED)
+
+# Canonical sample rate of every decoded buffer (16 kHz mono float32, as Whisper expects)
+TARGET_SAMPLE_RATE = 16000
 
 # Supported languages configuration
 SUPPORTED_LANGUAGES = {
@@ -109,23 +430,30 @@ SUPPORTED_LANGUAGES = {
     "mag": {"name": "Magahi", "whisper_model": "base", "tts_model": "tts_models/hi/custom/v1"},   # Fallback to Hindi
 }
 
+def whisper_model_size(language: str) -> str:
+    """Whisper model size configured for a language."""
+    return SUPPORTED_LANGUAGES.get(language, {}).get("whisper_model", "base")
+
 def get_whisper_model(language: str) -> Optional[Any]:
     """Load or retrieve cached Whisper model for the specified language."""
+    return get_whisper_model_by_size(whisper_model_size(language))
+
+def get_whisper_model_by_size(model_size: str) -> Optional[Any]:
+    """Load or retrieve cached Whisper model of the given size."""
     if not WHISPER_AVAILABLE:
         raise HTTPException(status_code=503, detail="Whisper is not available. Please install openai-whisper.")
 
-    model_size = SUPPORTED_LANGUAGES.get(language, {}).get("whisper_model", "base")
-    cache_key = f"whisper_{model_size}"
-
-    if cache_key not in models_cache:
+    def load():
         try:
             logger.info(f"Loading Whisper model: {model_size}")
-            models_cache[cache_key] = whisper.load_model(model_size)
+            whisper = lazy_import("whisper")
+            with time_stage("model_load", backend="whisper", model_size=model_size):
+                return whisper.load_model(model_size)
         except Exception as e:
             logger.error(f"Failed to load Whisper model {model_size}: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to load Whisper model: {str(e)}")
 
-    return models_cache[cache_key]
+    return model_registry.get(f"whisper_{model_size}", load)
 
 def get_tts_model(language: str) -> Optional[Any]:
     """Load or retrieve cached TTS model for the specified language."""
@@ -136,63 +464,1388 @@ def get_tts_model(language: str) -> Optional[Any]:
     if not model_name:
         raise HTTPException(status_code=400, detail=f"TTS model not available for language: {language}")
 
-    cache_key = f"tts_{language}"
+    def load():
+        logger.info(f"Loading TTS model for {language}: {model_name}")
+        tts_api = lazy_import("TTS.api")
+        with time_stage("model_load", language=language, backend="coqui"):
+            return tts_api.TTS(model_name).to("cpu")  # Use CPU for compatibility
 
-    if cache_key not in models_cache:
-        try:
-            logger.info(f"Loading TTS model for {language}: {model_name}")
-            models_cache[cache_key] = TTS(model_name).to("cpu")  # Use CPU for compatibility
-        except Exception as e:
-            logger.error(f"Failed to load TTS model for {language}: {e}")
-            # Fallback to English if language-specific model fails
-            if language != "en":
-                logger.info("Falling back to English TTS model")
-                return get_tts_model("en")
-            raise HTTPException(status_code=500, detail=f"Failed to load TTS model: {str(e)}")
+    try:
+        return model_registry.get(f"tts_{language}", load)
+    except Exception as e:
+        logger.error(f"Failed to load TTS model for {language}: {e}")
+        # Fallback to English if language-specific model fails
+        if language != "en":
+            logger.info("Falling back to English TTS model")
+            return get_tts_model("en")
+        raise HTTPException(status_code=500, detail=f"Failed to load TTS model: {str(e)}")
+
+# Whisper looks at audio through one padded 30 s log-mel window. Language
+# detection only needs that window, so it runs on the first 30 s that contain
+# speech (found with the streaming VAD's thresholds) whatever the upload's
+# length. Clips that fit in one window are detected and decoded from the same
+# spectrogram.
+
+WHISPER_WINDOW_SAMPLES = 30 * TARGET_SAMPLE_RATE
+
+def whisper_log_mel(model: Any, audio: np.ndarray) -> Any:
+    """Log-mel spectrogram of the first 30 s of ``audio``, padded, on the model's device."""
+    torch = lazy_import("torch")
+    whisper = lazy_import("whisper")
+    window = whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(audio[:WHISPER_WINDOW_SAMPLES], dtype=np.float32)))
+    return whisper.log_mel_spectrogram(window, model.dims.n_mels).to(model.device)
+
+def detect_language_from_mel(model: Any, mel: Any) -> str:
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+def run_whisper_language_detection(model: Any, audio_array: np.ndarray) -> str:
+    """Run Whisper's language detector and return the raw language code."""
+    return detect_language_from_mel(model, whisper_log_mel(model, audio_array))
+
+def supported_language(detected_lang: str) -> str:
+    """Map a Whisper language code to one of SUPPORTED_LANGUAGES."""
+    if detected_lang in SUPPORTED_LANGUAGES:
+        return detected_lang
+    elif detected_lang in ["hi", "ur"]:  # Urdu often detected as Hindi
+        return "hi"
+    else:
+        return "en"  # Default fallback
+
+def greedy_decode_failed(result: Any) -> bool:
+    """Whether a greedy decode looks degenerate by model.transcribe's own thresholds."""
+    return result.compression_ratio > 2.4 or result.avg_logprob < -1.0
+
+def transcribe_clip(model: Any, audio: np.ndarray, language: Optional[str] = None) -> Dict[str, Any]:
+    """Detect the language of a clip of at most 30 s and decode it from one spectrogram.
 
-    return models_cache[cache_key]
+    Without ``language`` the clip is decoded in the detected language. Falls
+    back to ``model.transcribe`` and its temperature schedule when the greedy
+    decode looks degenerate.
+    """
+    return decode_whisper_batch(model, [audio], language, detect=True)[0]
+
+def decoding_language(raw_lang: str) -> str:
+    """Language to decode in after Whisper detected ``raw_lang``.
 
-def detect_language(audio_data: bytes) -> str:
+    Supported languages (and Urdu, read as Hindi) decode as themselves; other
+    languages keep Whisper's code rather than being decoded as English.
+    """
+    detected_lang = supported_language(raw_lang)
+    return detected_lang if detected_lang != "en" else raw_lang
+
+def detect_language_from_array(audio_array: np.ndarray) -> str:
+    """Detect the language of already decoded audio using Whisper's language detection."""
+    return supported_language(detect_raw_language_from_array(audio_array))
+
+def detect_raw_language_from_array(audio_array: np.ndarray) -> str:
+    """Whisper's own language code for already decoded audio."""
+    window = first_speech_window(audio_array, WHISPER_WINDOW_SAMPLES)
+    # Use the English (base) model for language detection
+    model_size = whisper_model_size("en")
+    pool = whisper_workers.get(model_size)
+    if pool is not None:
+        with time_stage("detect", backend="worker", model_size=model_size):
+            detected_lang = pool.submit(window, task="detect_language").result()
+    else:
+        model = get_whisper_model("en")
+        with time_stage("detect", backend="thread", model_size=model_size):
+            detected_lang = run_whisper_language_detection(model, window)
+
+    logger.info(f"Detected language: {sanitize_for_log(str(detected_lang))}")
+    return detected_lang
+
+class AudioAnalysis:
+    """Request-scoped analysis of one upload.
+
+    Holds the canonical 16 kHz mono buffer produced by ``ingest_audio`` and
+    computes language detection and the quality estimate on first use, so a
+    request never decodes, detects or measures more than once.
+    """
+
+    def __init__(self, samples: np.ndarray):
+        self.samples = samples
+        self._detected_language: Optional[str] = None
+        self._quality: Optional["AudioQuality"] = None
+
+    @property
+    def quality(self) -> "AudioQuality":
+        if self._quality is None:
+            self._quality = AudioQuality(self.samples)
+        return self._quality
+
+    @property
+    def detected_language(self) -> str:
+        if self._detected_language is None:
+            try:
+                self._detected_language = detect_language_from_array(self.samples)
+            except Exception as e:
+                logger.error(f"Language detection failed: {e}")
+                self._detected_language = "en"  # Default fallback
+        return self._detected_language
+
+def detect_language(samples: np.ndarray) -> str:
     """Detect the language of the audio using Whisper's language detection."""
-    try:
-        # Convert audio to numpy array
-        audio_segment = AudioSegment.from_file(io.BytesIO(audio_data))
-        audio_array = np.array(audio_segment.get_array_of_samples(), dtype=np.float32)
-
-        # Normalize audio
-        if audio_segment.channels == 2:
-            audio_array = audio_array.reshape((-1, 2)).mean(axis=1)
-        audio_array = audio_array / (2**15 if audio_segment.sample_width == 2 else 2**31)
-
-        # Load base Whisper model for language detection
-        model = get_whisper_model("en")  # Use English model as base
-
-        # Detect language
-        audio_tensor = torch.from_numpy(audio_array).float()
-        result = model.detect_language(audio_tensor)
-
-        detected_lang = result[0] if isinstance(result, tuple) else result
-        logger.info(f"Detected language: {sanitize_for_log(str(detected_lang))}")
-
-        # Map to our supported languages
-        if detected_lang in SUPPORTED_LANGUAGES:
-            return detected_lang
-        elif detected_lang in ["hi", "ur"]:  # Urdu often detected as Hindi
-            return "hi"
+    return AudioAnalysis(samples).detected_language
+
+
+
+# Inference executor layer
+#
+# Blocking work (decoding, Whisper, TTS synthesis) never runs on the event loop.
+# Endpoints await one of two pools, each of which admits a bounded number of
+# queued plus running jobs and answers 503 beyond that, so /health and cheap
+# requests keep being served while heavy work runs.
+
+INFERENCE_THREAD_WORKERS = int(os.getenv("INFERENCE_THREAD_WORKERS", "4"))
+INFERENCE_THREAD_QUEUE_DEPTH = int(os.getenv("INFERENCE_THREAD_QUEUE_DEPTH", "32"))
+INFERENCE_PROCESS_WORKERS = int(os.getenv("INFERENCE_PROCESS_WORKERS", "0"))
+INFERENCE_PROCESS_QUEUE_DEPTH = int(os.getenv("INFERENCE_PROCESS_QUEUE_DEPTH", "16"))
+
+class InferencePool:
+    """An executor with a cap on the number of jobs queued or running on it."""
+
+    def __init__(self, name: str, executor, workers: int, max_pending: int):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.pending = 0
+        self._executor = executor
+
+    async def run(self, fn, *args, **kwargs):
+        # Only touched from the event loop thread, so no lock is needed
+        if self.pending >= self.max_pending:
+            logger.warning(f"Inference {self.name} pool saturated ({self.pending}/{self.max_pending})")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy: {self.name} inference queue is full",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class InferenceExecutor:
+    """Thread pool for GIL-releasing model calls, optional process pool for pure-Python CPU work.
+
+    Process pool jobs must be picklable module-level functions. With
+    ``INFERENCE_PROCESS_WORKERS=0`` they run on the thread pool instead.
+    """
+
+    def __init__(self, thread_workers: int, thread_queue_depth: int,
+                 process_workers: int, process_queue_depth: int):
+        self.threads = InferencePool(
+            "thread",
+            ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="inference"),
+            thread_workers,
+            thread_queue_depth,
+        )
+        if process_workers > 0:
+            self.processes = InferencePool(
+                "process",
+                ProcessPoolExecutor(max_workers=process_workers, mp_context=multiprocessing.get_context("spawn")),
+                process_workers,
+                process_queue_depth,
+            )
         else:
-            return "en"  # Default fallback
+            self.processes = None
+
+    async def run_in_thread(self, fn, *args, **kwargs):
+        return await self.threads.run(fn, *args, **kwargs)
+
+    async def run_in_process(self, fn, *args, **kwargs):
+        pool = self.processes or self.threads
+        return await pool.run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "thread": self.threads.stats(),
+            "process": self.processes.stats() if self.processes else None,
+        }
+
+    def shutdown(self):
+        self.threads.shutdown()
+        if self.processes:
+            self.processes.shutdown()
+
+inference = InferenceExecutor(
+    INFERENCE_THREAD_WORKERS,
+    INFERENCE_THREAD_QUEUE_DEPTH,
+    INFERENCE_PROCESS_WORKERS,
+    INFERENCE_PROCESS_QUEUE_DEPTH,
+)
 
+@app.on_event("shutdown")
+def shutdown_inference_executor():
+    inference.shutdown()
+
+# Whisper worker processes
+#
+# With WHISPER_WORKERS > 0 every configured model size gets a pool of spawned
+# processes that load the model once at startup and take jobs from a queue.
+# Decoded PCM travels through multiprocessing.shared_memory so only the block
+# name and length are pickled, and torch intra-op threads are split between
+# workers so they do not oversubscribe the cores.
+
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "0"))
+WHISPER_WORKER_MODELS = [
+    size.strip()
+    for size in os.getenv("WHISPER_WORKER_MODELS", "").split(",")
+    if size.strip()
+] or sorted({config["whisper_model"] for config in SUPPORTED_LANGUAGES.values()})
+WHISPER_WORKER_THREADS = int(os.getenv("WHISPER_WORKER_THREADS", "0"))
+WHISPER_WORKER_QUEUE_DEPTH = int(os.getenv("WHISPER_WORKER_QUEUE_DEPTH", "8"))
+WHISPER_WORKER_STARTUP_TIMEOUT = float(os.getenv("WHISPER_WORKER_STARTUP_TIMEOUT", "300"))
+
+def _whisper_worker_main(model_size: str, torch_threads: int, jobs, results):
+    """Worker process loop: load the model once, then serve jobs until told to stop."""
+    torch = lazy_import("torch")
+    whisper = lazy_import("whisper")
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    model = whisper.load_model(model_size, device="cpu")
+    # Pay the first-inference cost before reporting ready
+    model.transcribe(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), fp16=False)
+    pid = os.getpid()
+    results.put(("ready", pid, None, None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, task, shm_name, length, options = job
+        results.put(("started", pid, job_id, None))
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+        except FileNotFoundError as e:
+            results.put(("done", pid, job_id, (None, repr(e))))
+            continue
+        audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+        try:
+            if task == "detect_language":
+                output = run_whisper_language_detection(model, audio)
+            elif task == "transcribe_clip":
+                output = transcribe_clip(model, audio, **options)
+            elif task == "decode_batch":
+                offsets = list(itertools.accumulate(options["lengths"]))[:-1]
+                output = decode_whisper_batch(model, np.split(audio, offsets), options["language"], options["detect"])
+            else:
+                output = model.transcribe(audio, **options)
+            results.put(("done", pid, job_id, (output, None)))
+        except Exception as e:
+            results.put(("done", pid, job_id, (None, repr(e))))
+        finally:
+            # Drop the view before closing, shared memory refuses to close while exported
+            audio = None
+            shm.close()
+
+class WhisperWorkerPool:
+    """Pool of processes that each hold one preloaded Whisper model."""
+
+    def __init__(self, model_size: str, workers: int, torch_threads: int, max_pending: int):
+        self.model_size = model_size
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.max_pending = max(max_pending, workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._pending: Dict[int, Any] = {}
+        self._running: Dict[int, int] = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Semaphore(0)
+        self._stopping = False
+        self._collector = threading.Thread(target=self._collect_results, name=f"whisper-{model_size}-results", daemon=True)
+
+    def _spawn_worker(self):
+        process = self._context.Process(
+            target=_whisper_worker_main,
+            args=(self.model_size, self.torch_threads, self._jobs, self._results),
+            name=f"whisper-{self.model_size}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[process.pid] = process
+
+    def start(self, timeout: float):
+        logger.info(f"Starting {self.workers} Whisper {self.model_size} workers ({self.torch_threads} torch threads each)")
+        for _ in range(self.workers):
+            self._spawn_worker()
+        self._collector.start()
+        for _ in range(self.workers):
+            if not self._ready.acquire(timeout=timeout):
+                raise RuntimeError(f"Whisper {self.model_size} workers did not become ready within {timeout}s")
+
+    def submit(self, audio: np.ndarray, task: str = "transcribe", **options) -> concurrent.futures.Future:
+        """Queue a job; the returned future resolves with the worker's result."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server busy: Whisper {self.model_size} worker queue is full",
+                    headers={"Retry-After": "1"},
+                )
+            shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+            np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+            future = concurrent.futures.Future()
+            job_id = next(self._job_ids)
+            self._pending[job_id] = (future, shm)
+        self._jobs.put((job_id, task, shm.name, audio.size, options))
+        return future
+
+    async def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.submit(audio, **options))
+
+    def _finish(self, job_id: int, output: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return
+        future, shm = entry
+        shm.close()
+        shm.unlink()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(output)
+
+    def _reap_dead_workers(self):
+        for pid, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            del self._processes[pid]
+            job_id = self._running.pop(pid, None)
+            logger.error(f"Whisper {self.model_size} worker {pid} exited with code {process.exitcode}")
+            if job_id is not None:
+                self._finish(job_id, error=RuntimeError("Whisper worker crashed during transcription"))
+            if not self._stopping:
+                self._spawn_worker()
+
+    def _collect_results(self):
+        while not self._stopping:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._reap_dead_workers()
+                continue
+            if message is None:
+                break
+            kind, pid, job_id, payload = message
+            if kind == "ready":
+                self._ready.release()
+            elif kind == "started":
+                self._running[pid] = job_id
+            elif kind == "done":
+                self._running.pop(pid, None)
+                output, error = payload
+                self._finish(job_id, output, RuntimeError(error) if error else None)
+            self._reap_dead_workers()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._processes),
+            "torch_threads": self.torch_threads,
+            "pending": len(self._pending),
+            "running": len(self._running),
+            "max_pending": self.max_pending,
+        }
+
+    def shutdown(self):
+        self._stopping = True
+        for _ in self._processes:
+            self._jobs.put(None)
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        for job_id in list(self._pending):
+            self._finish(job_id, error=RuntimeError("Whisper worker pool shut down"))
+
+# Worker pools keyed by model size; empty when Whisper runs in-process
+whisper_workers: Dict[str, WhisperWorkerPool] = {}
+
+def start_whisper_workers():
+    if WHISPER_WORKERS <= 0 or not WHISPER_AVAILABLE:
+        return
+    torch_threads = WHISPER_WORKER_THREADS or max(1, (os.cpu_count() or 1) // (WHISPER_WORKERS * len(WHISPER_WORKER_MODELS)))
+    for model_size in WHISPER_WORKER_MODELS:
+        pool = WhisperWorkerPool(model_size, WHISPER_WORKERS, torch_threads, WHISPER_WORKERS * WHISPER_WORKER_QUEUE_DEPTH)
+        pool.start(WHISPER_WORKER_STARTUP_TIMEOUT)
+        whisper_workers[model_size] = pool
+
+@app.on_event("shutdown")
+def stop_whisper_workers():
+    for pool in whisper_workers.values():
+        pool.shutdown()
+    whisper_workers.clear()
+
+# Dynamic micro-batching
+#
+# Short clips that arrive within STT_BATCH_WINDOW_MS of each other and share a
+# model size and decoding language are padded to one 30 s log-mel window each
+# and decoded together in a single forward pass, then fanned back out. Items
+# whose greedy decode looks degenerate are redone alone with model.transcribe
+# and its temperature schedule.
+#
+# Clips sent for language detection (/stt without a language) are batched
+# separately: the stacked spectrogram goes through one detection pass, then
+# the clips are decoded in one pass per detected language.
+
+STT_BATCH_WINDOW_MS = float(os.getenv("STT_BATCH_WINDOW_MS", "20"))
+STT_BATCH_MAX_SIZE = int(os.getenv("STT_BATCH_MAX_SIZE", "16"))
+STT_BATCH_MAX_AUDIO_SECONDS = min(float(os.getenv("STT_BATCH_MAX_AUDIO_SECONDS", "10")), 30.0)
+
+batch_size_histogram = Histogram(
+    "stt_batch_size", "Clips decoded per Whisper forward pass", ("model_size",),
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+batch_wait_histogram = Histogram(
+    "stt_batch_wait_seconds", "Time a clip waited for its batch to be dispatched", ("model_size",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25),
+)
+batch_occupancy_histogram = Histogram(
+    "stt_batch_occupancy_ratio", "Batch size divided by STT_BATCH_MAX_SIZE", ("model_size",),
+    buckets=(0.125, 0.25, 0.5, 0.75, 1.0),
+)
+
+def decode_whisper_batch(model: Any, audio_batch: List[np.ndarray], language: Optional[str],
+                         detect: bool = False) -> List[Dict[str, Any]]:
+    """Decode several short clips in one batched Whisper forward pass.
+
+    With ``detect`` every clip's language is detected from the same
+    spectrograms and returned as "detected_language", and clips are decoded
+    in their detected language unless ``language`` forces one. The detection
+    pass's wall time is returned as "detect_seconds" for the caller to record.
+    """
+    torch = lazy_import("torch")
+    whisper = lazy_import("whisper")
+    mel = torch.stack([whisper_log_mel(model, audio) for audio in audio_batch])
+    if detect:
+        started = time.perf_counter()
+        _, probs = model.detect_language(mel)
+        detect_seconds = time.perf_counter() - started
+        raw_langs = [max(item_probs, key=item_probs.get) for item_probs in probs]
+        detected_langs = [supported_language(raw_lang) for raw_lang in raw_langs]
+        languages = [language or decoding_language(raw_lang) for raw_lang in raw_langs]
+    else:
+        languages = [language] * len(audio_batch)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(audio_batch)
+    for decode_language in dict.fromkeys(languages):
+        indices = [i for i, item_language in enumerate(languages) if item_language == decode_language]
+        options = whisper.DecodingOptions(language=decode_language, without_timestamps=True, fp16=False)
+        for i, result in zip(indices, whisper.decode(model, mel[indices], options)):
+            if greedy_decode_failed(result):
+                results[i] = model.transcribe(audio_batch[i], language=result.language, fp16=False)
+                continue
+            results[i] = {
+                "text": result.text,
+                "language": result.language,
+                "segments": [],
+                "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob,
+            }
+    if detect:
+        for result, detected_lang in zip(results, detected_langs):
+            result["detected_language"] = detected_lang
+            result["detect_seconds"] = detect_seconds
+    return results
+
+def _decode_whisper_batch_in_process(model_size: str, audio_batch: List[np.ndarray], language: Optional[str],
+                                     detect: bool) -> List[Dict[str, Any]]:
+    model = get_whisper_model_by_size(model_size)
+    return decode_whisper_batch(model, audio_batch, language, detect)
+
+class WhisperBatcher:
+    """Collects concurrent short transcriptions and decodes them as one batch."""
+
+    def __init__(self, window_seconds: float, max_size: int):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._batches: Dict[Tuple[str, Optional[str], bool], List[Tuple[np.ndarray, asyncio.Future, float]]] = {}
+        self._timers: Dict[Tuple[str, Optional[str], bool], asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks, so running batches are held here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def transcribe(self, audio_array: np.ndarray, model_size: str, language: Optional[str],
+                         detect: bool = False) -> Dict[str, Any]:
+        """Decode one clip as part of the next batch; ``detect`` as in decode_whisper_batch."""
+        loop = asyncio.get_running_loop()
+        key = (model_size, language, detect)
+        future = loop.create_future()
+        batch = self._batches.setdefault(key, [])
+        batch.append((audio_array, future, loop.time()))
+        if len(batch) >= self.max_size:
+            self._dispatch(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_seconds, self._dispatch, key)
+        return await future
+
+    @property
+    def pending(self) -> int:
+        """Clips waiting for their batch to be dispatched."""
+        return sum(len(batch) for batch in self._batches.values())
+
+    def _dispatch(self, key: Tuple[str, Optional[str], bool]):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Tuple[str, Optional[str], bool], batch: List[Tuple[np.ndarray, asyncio.Future, float]]):
+        model_size, language, detect = key
+        try:
+            now = asyncio.get_running_loop().time()
+            batch_size_histogram.observe(len(batch), model_size=model_size)
+            batch_occupancy_histogram.observe(len(batch) / self.max_size, model_size=model_size)
+            for _, _, queued_at in batch:
+                batch_wait_histogram.observe(now - queued_at, model_size=model_size)
+
+            audio_batch = [audio for audio, _, _ in batch]
+            pool = whisper_workers.get(model_size)
+            if pool is not None:
+                results = await asyncio.wrap_future(pool.submit(
+                    np.concatenate(audio_batch),
+                    task="decode_batch",
+                    language=language,
+                    detect=detect,
+                    lengths=[len(audio) for audio in audio_batch],
+                ))
+            else:
+                results = await inference.run_in_thread(
+                    _decode_whisper_batch_in_process, model_size, audio_batch, language, detect)
+        except BaseException as e:
+            # Every waiter gets the error, whatever step raised it
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+whisper_batcher = WhisperBatcher(STT_BATCH_WINDOW_MS / 1000.0, STT_BATCH_MAX_SIZE) if STT_BATCH_MAX_SIZE > 1 else None
+
+async def transcribe_audio(audio_array: np.ndarray, lang: str, **options) -> Dict[str, Any]:
+    """Transcribe on the worker pool for the language's model size, or in-process.
+
+    Short clips whose only option is the decoding language go through the
+    micro-batcher when batching is enabled.
+    """
+    model_size = whisper_model_size(lang)
+    if (
+        whisper_batcher is not None
+        and set(options) <= {"language"}
+        and len(audio_array) <= STT_BATCH_MAX_AUDIO_SECONDS * TARGET_SAMPLE_RATE
+    ):
+        with time_stage("transcribe", language=lang, backend="batch", model_size=model_size):
+            return await whisper_batcher.transcribe(audio_array, model_size, options.get("language"))
+    pool = whisper_workers.get(model_size)
+    if pool is not None:
+        with time_stage("transcribe", language=lang, backend="worker", model_size=model_size):
+            return await pool.transcribe(audio_array, **options)
+    model = await inference.run_in_thread(get_whisper_model, lang)
+    with time_stage("transcribe", language=lang, backend="thread", model_size=model_size):
+        return await inference.run_in_thread(model.transcribe, audio_array, **options)
+
+async def transcribe_and_detect(audio_array: np.ndarray, lang: Optional[str]) -> Dict[str, Any]:
+    """Detect and transcribe a clip of at most 30 s from one log-mel spectrogram.
+
+    ``lang`` forces the decoding language; the result's "detected_language"
+    is filled in either way. Short clips go through the micro-batcher when
+    batching is enabled.
+    """
+    model_size = whisper_model_size(lang or "en")
+    pool = whisper_workers.get(model_size)
+    if whisper_batcher is not None and len(audio_array) <= STT_BATCH_MAX_AUDIO_SECONDS * TARGET_SAMPLE_RATE:
+        backend = "batch"
+        started = time.perf_counter()
+        result = await whisper_batcher.transcribe(audio_array, model_size, lang, detect=True)
+    elif pool is not None:
+        backend = "worker"
+        started = time.perf_counter()
+        result = await asyncio.wrap_future(pool.submit(audio_array, task="transcribe_clip", language=lang))
+    else:
+        backend = "thread"
+        model = await inference.run_in_thread(get_whisper_model_by_size, model_size)
+        started = time.perf_counter()
+        result = await inference.run_in_thread(transcribe_clip, model, audio_array, lang)
+    # The detection pass is timed next to the model; the rest of the wait counts as transcribe
+    elapsed = time.perf_counter() - started
+    detect_seconds = result.pop("detect_seconds")
+    stage_seconds.observe(detect_seconds, stage="detect", backend=backend, model_size=model_size)
+    stage_seconds.observe(elapsed - detect_seconds, stage="transcribe", language=lang or "auto",
+                          backend=backend, model_size=model_size)
+    detected_lang = result["detected_language"]
+    if lang is None and whisper_model_size(detected_lang) != model_size:
+        # The detected language is configured with a different model, decode again with it
+        result = await transcribe_audio(audio_array, detected_lang, language=detected_lang)
+        result["detected_language"] = detected_lang
+    return result
+
+# Startup warm-up and readiness
+#
+# MODEL_PRELOAD lists models to load, pin and run one dummy inference on at
+# startup, e.g. "whisper:base,tts:en,tts:hi". Warm-up runs in the background so
+# /health/live answers immediately, while /health/ready returns 503 until the
+# worker pools are up and every preload has finished.
+
+MODEL_PRELOAD = [spec.strip() for spec in os.getenv("MODEL_PRELOAD", "").split(",") if spec.strip()]
+
+class ServiceReadiness:
+    def __init__(self, preload: List[str]):
+        self.preload = preload
+        self.warmed: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+        # Preloads that could only be served by another model, e.g. "tts:ta" -> "tts_en"
+        self.fallbacks: Dict[str, str] = {}
+        self.ready = False
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "preload": self.preload,
+            "warmed_seconds": self.warmed,
+            "failed": self.failed,
+            "fallbacks": self.fallbacks,
+            "warmup_seconds": (self.finished_at or time.time()) - self.started_at,
+        }
+
+readiness = ServiceReadiness(MODEL_PRELOAD)
+
+def warm_up_model(spec: str) -> str:
+    """Load, pin and run one dummy inference for a "kind:name" preload entry.
+
+    Returns the registry key of the model that was warmed, which differs from
+    the requested one when a TTS language fell back to the English model.
+    """
+    kind, _, name = spec.partition(":")
+    if kind == "whisper":
+        key = f"whisper_{name}"
+        if name in whisper_workers:
+            return key  # Workers warm themselves before reporting ready
+        model = get_whisper_model_by_size(name)
+        model_registry.pin(key)
+        silence = np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32)
+        model.transcribe(silence, fp16=False)
+        if whisper_batcher is not None:
+            decode_whisper_batch(model, [silence], None)
+        return key
+    elif kind == "tts":
+        if name not in SUPPORTED_LANGUAGES:
+            raise ValueError(f"Unsupported language: {name}")
+        synthesize_coqui("Warm up.", name, None)
+        # get_tts_model falls back to English when the language's model fails to load
+        key = f"tts_{name}" if f"tts_{name}" in model_registry else "tts_en"
+        model_registry.pin(key)
+        return key
+    else:
+        raise ValueError(f"Unknown preload kind: {kind}")
+
+def warm_up_service():
+    try:
+        start_whisper_workers()
     except Exception as e:
-        logger.error(f"Language detection failed: {e}")
-        return "en"  # Default fallback
+        logger.error(f"Starting Whisper workers failed: {e}")
+        readiness.failed["whisper_workers"] = str(e)
+    for spec in readiness.preload:
+        started = time.perf_counter()
+        try:
+            logger.info(f"Warming up {sanitize_for_log(spec)}")
+            key = warm_up_model(spec)
+            readiness.warmed[spec] = time.perf_counter() - started
+            if key != spec.replace(":", "_", 1):
+                logger.warning(f"Preload {sanitize_for_log(spec)} fell back to {key}")
+                readiness.fallbacks[spec] = key
+        except Exception as e:
+            logger.error(f"Warm-up of {sanitize_for_log(spec)} failed: {e}")
+            readiness.failed[spec] = str(e)
+    readiness.finished_at = time.time()
+    readiness.ready = not readiness.failed
+    logger.info(f"Service warm-up finished in {readiness.finished_at - readiness.started_at:.1f}s (ready: {readiness.ready})")
+
+@app.on_event("startup")
+async def start_warm_up():
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, warm_up_service)
+
+# TTS audio cache
+#
+# Synthesized audio is content addressed by hash(text, lang, speaker, engine,
+# format). Hits are served from an in-memory LRU first, then from a size-capped
+# directory on disk; disk hits are promoted back into memory. Responses carry
+# the key as a strong ETag and honour single byte ranges, and the same audio can
+# be fetched again with GET /tts/cache/{key}, which answers a matching
+# If-None-Match with 304. As RFC 9110 requires for other methods, a POST /tts
+# whose If-None-Match matches is refused with 412 instead.
+
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "512"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "stt_tts_cache"))
+
+AUDIO_MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+
+tts_cache_requests_total = Counter("tts_cache_requests_total", "TTS cache lookups by result", ("result",))
+tts_cache_bytes = Gauge("tts_cache_bytes", "Bytes held by each TTS cache tier", ("tier",))
+
+def tts_cache_key(text: str, lang: str, speaker: Optional[str], engine: str, audio_format: str) -> str:
+    payload = json.dumps([text, lang, speaker, engine, audio_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class TTSAudioCache:
+    """Two-tier (memory LRU, then disk) cache of synthesized audio."""
+
+    def __init__(self, memory_bytes: int, disk_bytes: int, directory: str):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = Path(directory)
+        self._memory: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._memory_used = 0
+        self._disk: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        if self.disk_bytes > 0:
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Index existing cache files, oldest access first, so eviction survives restarts."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [path for path in self.directory.iterdir() if path.suffix[1:] in AUDIO_MEDIA_TYPES]
+        for path in sorted(files, key=lambda path: path.stat().st_mtime):
+            size = path.stat().st_size
+            self._disk[path.stem] = (path, size)
+            self._disk_used += size
+        self._evict_disk_locked()
+        tts_cache_bytes.set(self._disk_used, tier="disk")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (audio, format) for key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                tts_cache_requests_total.inc(result="memory_hit")
+                return entry
+            disk_entry = self._disk.get(key)
+            if disk_entry is not None:
+                self._disk.move_to_end(key)
+        if disk_entry is not None:
+            path, _ = disk_entry
+            try:
+                audio = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                with self._lock:
+                    self._forget_disk_locked(key)
+            else:
+                tts_cache_requests_total.inc(result="disk_hit")
+                entry = (audio, path.suffix[1:])
+                with self._lock:
+                    self._put_memory_locked(key, entry)
+                return entry
+        tts_cache_requests_total.inc(result="miss")
+        return None
+
+    def put(self, key: str, audio: bytes, audio_format: str):
+        with self._lock:
+            self._put_memory_locked(key, (audio, audio_format))
+            if self.disk_bytes <= 0 or len(audio) > self.disk_bytes or key in self._disk:
+                return
+        path = self.directory / f"{key}.{audio_format}"
+        # Concurrent misses for the same prompt each write their own temp file
+        temp_path = self.directory / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            temp_path.write_bytes(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry to disk: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            # Another put for this key may have finished while the file was written;
+            # the file on disk is now ours, so replace its size rather than adding to it
+            previous = self._disk.pop(key, None)
+            if previous is not None:
+                self._disk_used -= previous[1]
+            self._disk[key] = (path, len(audio))
+            self._disk_used += len(audio)
+            self._evict_disk_locked()
+            tts_cache_bytes.set(self._disk_used, tier="disk")
+
+    def _put_memory_locked(self, key: str, entry: Tuple[bytes, str]):
+        size = len(entry[0])
+        if size > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous[0])
+        self._memory[key] = entry
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+        tts_cache_bytes.set(self._memory_used, tier="memory")
+
+    def _forget_disk_locked(self, key: str) -> Optional[Path]:
+        entry = self._disk.pop(key, None)
+        if entry is None:
+            return None
+        self._disk_used -= entry[1]
+        return entry[0]
+
+    def _evict_disk_locked(self):
+        while self._disk_used > self.disk_bytes and self._disk:
+            key = next(iter(self._disk))
+            path = self._forget_disk_locked(key)
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        results = {sample["labels"]["result"]: sample["value"] for sample in tts_cache_requests_total.snapshot()}
+        lookups = sum(results.values())
+        hits = results.get("memory_hit", 0) + results.get("disk_hit", 0)
+        return {
+            "memory": {"entries": len(self._memory), "bytes": self._memory_used, "capacity_bytes": self.memory_bytes},
+            "disk": {"entries": len(self._disk), "bytes": self._disk_used, "capacity_bytes": self.disk_bytes},
+            "lookups": results,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+tts_cache = TTSAudioCache(
+    int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+    int(TTS_CACHE_DISK_MB * 1024 * 1024),
+    TTS_CACHE_DIR,
+)
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=start-end" range into inclusive offsets; None if unsatisfiable."""
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and (
+        if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    )
+
+def audio_response(request: Request, audio: bytes, audio_format: str, key: str, filename: str) -> Response:
+    """Serve audio with a strong ETag, conditional GET and single-range support."""
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=86400",
+        "Content-Location": f"/tts/cache/{key}",
+        "Content-Disposition": f"attachment; filename={filename}",
+    }
+    media_type = AUDIO_MEDIA_TYPES[audio_format]
+    if request.method in ("GET", "HEAD") and etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = parse_byte_range(range_header, len(audio))
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(audio)}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(audio)}"
+        return Response(content=audio[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+    return Response(content=audio, media_type=media_type, headers=headers)
+
+# pyttsx3 can only render to a path; keep that scratch file in RAM where possible
+TTS_SCRATCH_DIR = os.getenv("TTS_SCRATCH_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+def synthesize_gtts(text: str, lang: str) -> bytes:
+    """Synthesize MP3 audio with gTTS straight into memory."""
+    tts = gTTS(text=text, lang=lang)
+    buffer = io.BytesIO()
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+
+def render_pyttsx3(engine: Any, text: str) -> bytes:
+    """Render text to WAV bytes with an existing pyttsx3 engine."""
+    fd, temp_path = tempfile.mkstemp(suffix=".wav", dir=TTS_SCRATCH_DIR)
+    os.close(fd)
+    try:
+        engine.save_to_file(text, temp_path)
+        engine.runAndWait()
+        return Path(temp_path).read_bytes()
+    finally:
+        os.unlink(temp_path)
+
+def synthesize_pyttsx3_unpooled(text: str) -> bytes:
+    """Synthesize WAV audio with a freshly initialised pyttsx3 engine."""
+    return render_pyttsx3(pyttsx3.init(), text)
+
+# pyttsx3 engine pool
+#
+# Engine start-up dominates short phrases and an engine must not be shared
+# between threads, so PYTTSX3_POOL_SIZE worker threads each own one long-lived
+# engine and take jobs from a shared queue, which hands work to whichever engine
+# is idle. Engines are health-checked before use and recycled after
+# PYTTSX3_MAX_USES renders or any failure; a worker stuck past PYTTSX3_TIMEOUT
+# is retired and replaced.
+#
+# Only the Windows sapi5 driver keeps engines apart (one COM object per
+# engine). espeak initialises its library once per process and every driver
+# instance re-registers the process-wide synth callback, and nsss shares the
+# process's AppKit run loop, so on those drivers the pool runs a single engine
+# and a stuck worker is not replaced while it may still be inside the driver.
+
+PYTTSX3_POOL_SIZE = int(os.getenv("PYTTSX3_POOL_SIZE", "2"))
+PYTTSX3_MAX_USES = int(os.getenv("PYTTSX3_MAX_USES", "200"))
+PYTTSX3_QUEUE_DEPTH = int(os.getenv("PYTTSX3_QUEUE_DEPTH", "32"))
+PYTTSX3_TIMEOUT = float(os.getenv("PYTTSX3_TIMEOUT", "30"))
+PYTTSX3_THREAD_ISOLATED_DRIVERS = {"sapi5"}
+
+def pyttsx3_driver_name() -> str:
+    """The driver pyttsx3 picks by default on this platform."""
+    if sys.platform == "win32":
+        return "sapi5"
+    if sys.platform == "darwin":
+        return "nsss"
+    return "espeak"
+
+pyttsx3_engine_events = Counter("pyttsx3_engine_events_total", "pyttsx3 engine lifecycle events", ("event",))
+
+class Pyttsx3EnginePool:
+    """Pool of pyttsx3 engines, each owned by a dedicated worker thread."""
+
+    def __init__(self, size: int, max_uses: int, max_pending: int = PYTTSX3_QUEUE_DEPTH,
+                 driver: Optional[str] = None):
+        self.driver = driver or pyttsx3_driver_name()
+        self.thread_isolated = self.driver in PYTTSX3_THREAD_ISOLATED_DRIVERS
+        if size > 1 and not self.thread_isolated:
+            logger.warning(f"pyttsx3 driver {self.driver} is process-wide, using 1 engine instead of {size}")
+            size = 1
+        self.size = size
+        self.max_uses = max_uses
+        self.max_pending = max(max_pending, size)
+        self._jobs: "queue.Queue[Optional[Tuple[str, concurrent.futures.Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: Dict[int, threading.Thread] = {}
+        self._busy_since: Dict[int, float] = {}
+        self._retired: set = set()
+        self._worker_ids = itertools.count()
+        self._pending = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            while len(self._workers) < self.size:
+                worker_id = next(self._worker_ids)
+                thread = threading.Thread(target=self._run, args=(worker_id,), name=f"pyttsx3-{worker_id}", daemon=True)
+                self._workers[worker_id] = thread
+                thread.start()
+
+    @staticmethod
+    def _create_engine() -> Any:
+        # pyttsx3.init() hands every caller the same cached engine; build private ones
+        pyttsx3_engine_events.inc(event="created")
+        return pyttsx3.Engine()
+
+    @staticmethod
+    def _healthy(engine: Any) -> bool:
+        try:
+            return engine.getProperty("rate") is not None
+        except Exception:
+            return False
+
+    def _run(self, worker_id: int):
+        engine = None
+        uses = 0
+        while worker_id not in self._retired:
+            job = self._jobs.get()
+            if job is None:
+                break
+            text, future = job
+            with self._lock:
+                self._pending -= 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._busy_since[worker_id] = time.monotonic()
+            try:
+                if engine is not None and (uses >= self.max_uses or not self._healthy(engine)):
+                    pyttsx3_engine_events.inc(event="recycled")
+                    engine = None
+                if engine is None:
+                    engine, uses = self._create_engine(), 0
+                audio = render_pyttsx3(engine, text)
+                uses += 1
+                future.set_result(audio)
+            except Exception as e:
+                pyttsx3_engine_events.inc(event="failed")
+                engine = None
+                future.set_exception(e)
+            finally:
+                self._busy_since.pop(worker_id, None)
+        with self._lock:
+            self._workers.pop(worker_id, None)
+
+    def _replace_stuck_workers(self):
+        now = time.monotonic()
+        with self._lock:
+            stuck = [worker_id for worker_id, since in list(self._busy_since.items()) if now - since > PYTTSX3_TIMEOUT]
+            for worker_id in stuck:
+                if worker_id in self._retired:
+                    continue
+                if not self.thread_isolated:
+                    # A second engine would share the driver with the stuck one
+                    logger.error(f"pyttsx3 worker {worker_id} stuck for over {PYTTSX3_TIMEOUT}s")
+                    continue
+                logger.error(f"pyttsx3 worker {worker_id} stuck for over {PYTTSX3_TIMEOUT}s, replacing it")
+                pyttsx3_engine_events.inc(event="stuck")
+                self._retired.add(worker_id)
+                self._workers.pop(worker_id, None)
+
+    def submit(self, text: str) -> concurrent.futures.Future:
+        self._replace_stuck_workers()
+        self._ensure_started()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server busy: pyttsx3 engine queue is full",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._jobs.put((text, future))
+        return future
+
+    def synthesize(self, text: str, timeout: float = PYTTSX3_TIMEOUT) -> bytes:
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "driver": self.driver,
+            "size": self.size,
+            "workers": len(self._workers),
+            "busy": len(self._busy_since),
+            "pending": self._pending,
+            "max_uses": self.max_uses,
+        }
+
+    def shutdown(self):
+        for _ in list(self._workers):
+            self._jobs.put(None)
+
+pyttsx3_pool = Pyttsx3EnginePool(PYTTSX3_POOL_SIZE, PYTTSX3_MAX_USES) if PYTTSX3_AVAILABLE and PYTTSX3_POOL_SIZE > 0 else None
+
+@app.on_event("shutdown")
+def stop_pyttsx3_pool():
+    if pyttsx3_pool is not None:
+        pyttsx3_pool.shutdown()
+
+async def synthesize_pyttsx3(text: str) -> bytes:
+    """Synthesize WAV audio with the local pyttsx3 engine, pooled when enabled."""
+    if pyttsx3_pool is None:
+        return await inference.run_in_thread(synthesize_pyttsx3_unpooled, text)
+    # Await the engine's worker directly rather than parking an inference thread on it
+    future = pyttsx3_pool.submit(text)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), PYTTSX3_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="pyttsx3 synthesis timed out")
+
+# Coqui TTS synthesis
+#
+# Runs the registry's cached Coqui model on its own bounded thread pool so local
+# synthesis never competes with Whisper for inference threads, and renders the
+# waveform to WAV in memory. Calls on one model are serialised because the
+# synthesizer keeps per-call state.
+
+COQUI_TTS_WORKERS = int(os.getenv("COQUI_TTS_WORKERS", "2"))
+COQUI_TTS_QUEUE_DEPTH = int(os.getenv("COQUI_TTS_QUEUE_DEPTH", "16"))
+
+coqui_pool = InferencePool(
+    "coqui",
+    ThreadPoolExecutor(max_workers=COQUI_TTS_WORKERS, thread_name_prefix="coqui"),
+    COQUI_TTS_WORKERS,
+    COQUI_TTS_QUEUE_DEPTH,
+)
+_coqui_model_locks: Dict[int, threading.Lock] = {}
+_coqui_model_locks_guard = threading.Lock()
+
+@app.on_event("shutdown")
+def stop_coqui_pool():
+    coqui_pool.shutdown()
+
+def synthesize_coqui(text: str, lang: str, speaker: Optional[str]) -> bytes:
+    """Synthesize WAV audio with the cached Coqui model for a language."""
+    model = get_tts_model(lang)
+    kwargs: Dict[str, Any] = {}
+    if speaker and getattr(model, "is_multi_speaker", False):
+        kwargs["speaker"] = speaker
+    if getattr(model, "is_multi_lingual", False):
+        kwargs["language"] = lang
+    with _coqui_model_locks_guard:
+        lock = _coqui_model_locks.setdefault(id(model), threading.Lock())
+    with lock:
+        waveform = model.tts(text=text, **kwargs)
+    with time_stage("encode", language=lang, backend="coqui"):
+        buffer = io.BytesIO()
+        sf.write(buffer, np.asarray(waveform, dtype=np.float32), model.synthesizer.output_sample_rate, format="WAV", subtype="PCM_16")
+        return buffer.getvalue()
+
+# TTS backends
+#
+# Every engine implements TTSBackend. A request may name its backend; otherwise
+# TTS_LANGUAGE_BACKENDS (e.g. "hi:coqui,ta:coqui") picks one per language and
+# TTS_DEFAULT_BACKEND (gTTS, then pyttsx3, then Coqui when unset) covers the rest.
+
+class TTSBackend(ABC):
+    """Interface for speech synthesis engines."""
+
+    name = ""
+    audio_format = ""
+
+    @abstractmethod
+    def available(self) -> bool:
+        ...
+
+    def supports(self, lang: str) -> bool:
+        return True
 
+    @abstractmethod
+    async def synthesize(self, text: str, lang: str, speaker: Optional[str]) -> bytes:
+        ...
 
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS; needs outbound network access."""
+
+    name = "gtts"
+    audio_format = "mp3"
+
+    def available(self) -> bool:
+        return GTTS_AVAILABLE
+
+    async def synthesize(self, text: str, lang: str, speaker: Optional[str]) -> bytes:
+        return await inference.run_in_thread(synthesize_gtts, text, lang)
+
+class Pyttsx3Backend(TTSBackend):
+    """Local system voices through the pyttsx3 engine pool."""
+
+    name = "pyttsx3"
+    audio_format = "wav"
+
+    def available(self) -> bool:
+        return PYTTSX3_AVAILABLE
+
+    async def synthesize(self, text: str, lang: str, speaker: Optional[str]) -> bytes:
+        return await synthesize_pyttsx3(text)
+
+class CoquiBackend(TTSBackend):
+    """Offline neural TTS with the per-language models in SUPPORTED_LANGUAGES."""
+
+    name = "coqui"
+    audio_format = "wav"
+
+    def available(self) -> bool:
+        return TTS_AVAILABLE
+
+    def supports(self, lang: str) -> bool:
+        return bool(SUPPORTED_LANGUAGES.get(lang, {}).get("tts_model"))
+
+    async def synthesize(self, text: str, lang: str, speaker: Optional[str]) -> bytes:
+        return await coqui_pool.run(synthesize_coqui, text, lang, speaker)
+
+TTS_BACKENDS: Dict[str, TTSBackend] = {
+    backend.name: backend for backend in (GTTSBackend(), Pyttsx3Backend(), CoquiBackend())
+}
+TTS_DEFAULT_BACKEND = os.getenv("TTS_DEFAULT_BACKEND", TTS_LIB or ("coqui" if TTS_AVAILABLE else ""))
+TTS_LANGUAGE_BACKENDS = dict(
+    entry.split(":", 1)
+    for entry in (item.strip() for item in os.getenv("TTS_LANGUAGE_BACKENDS", "").split(","))
+    if ":" in entry
+)
+
+def select_tts_backend(lang: str, requested: Optional[str] = None) -> TTSBackend:
+    """Resolve the backend for a request: explicit choice, then per-language, then default."""
+    name = requested or TTS_LANGUAGE_BACKENDS.get(lang) or TTS_DEFAULT_BACKEND
+    if not name:
+        raise HTTPException(status_code=503, detail="No TTS library available")
+    backend = TTS_BACKENDS.get(name)
+    if backend is None:
+        raise HTTPException(status_code=400, detail=f"Unknown TTS backend: {name}")
+    if not backend.available():
+        raise HTTPException(status_code=503, detail=f"TTS backend {name} is not available")
+    if not backend.supports(lang):
+        raise HTTPException(status_code=400, detail=f"TTS backend {name} does not support language: {lang}")
+    return backend
+
+async def synthesize_cached(backend: TTSBackend, text: str, lang: str, speaker: Optional[str]) -> Tuple[bytes, str, str]:
+    """Synthesize through the TTS cache; returns (audio, format, cache key)."""
+    audio_format = backend.audio_format
+    key = tts_cache_key(text, lang, speaker, backend.name, audio_format)
+    cached = await asyncio.to_thread(tts_cache.get, key)
+    if cached is not None:
+        return cached[0], audio_format, key
+    with time_stage("tts_synthesis", language=lang, backend=backend.name):
+        audio_data = await backend.synthesize(text, lang, speaker)
+    await asyncio.to_thread(tts_cache.put, key, audio_data, audio_format)
+    return audio_data, audio_format, key
+
+# Sentence-chunked streaming TTS
+#
+# Long text is split into sentences (and clauses or words when a sentence is
+# too long) and synthesized as a pipeline: chunk n+1 is being synthesized while
+# chunk n is sent, so playback starts after the first sentence instead of the
+# whole text. Chunks go through the TTS cache individually.
+
+TTS_STREAM_MAX_CHUNK_CHARS = int(os.getenv("TTS_STREAM_MAX_CHUNK_CHARS", "200"))
+TTS_STREAM_MIN_CHUNK_CHARS = int(os.getenv("TTS_STREAM_MIN_CHUNK_CHARS", "40"))
+
+# Devanagari, Bengali, Odia and Gurmukhi scripts end sentences with the danda;
+# the Dravidian scripts and English use Latin punctuation. A sentence ends after
+# a run of terminal punctuation and any closing quotes or brackets, and with
+# Latin punctuation only where whitespace or the end of the text follows.
+DANDA_LANGUAGES = {"hi", "mr", "bn", "as", "or", "pa", "mai", "bho", "awa", "mag"}
+SENTENCE_CLOSERS = "\"'\u201d\u2019\u00bb)\\]"
+SENTENCE_END = re.compile(rf"[.!?]+[{SENTENCE_CLOSERS}]*(?=\s|$)")
+DANDA_SENTENCE_END = re.compile(
+    rf"[.!?]*[\u0964\u0965][.!?\u0964\u0965]*[{SENTENCE_CLOSERS}]*|[.!?]+[{SENTENCE_CLOSERS}]*(?=\s|$)"
+)
+WORD_CHARACTER = re.compile(r"\w")
+CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:\u060c])\s+")
+
+tts_time_to_first_audio = Histogram(
+    "tts_time_to_first_audio_seconds", "Time from a streaming TTS request to its first audio chunk",
+    ("transport", "engine"),
+)
+
+def _pack_pieces(pieces: List[str], max_chars: int) -> List[str]:
+    """Greedily join pieces with spaces without exceeding max_chars where possible."""
+    packed: List[str] = []
+    for piece in pieces:
+        if packed and len(packed[-1]) + 1 + len(piece) <= max_chars:
+            packed[-1] = f"{packed[-1]} {piece}"
+        else:
+            packed.append(piece)
+    return packed
+
+def split_sentences(text: str, sentence_end: "re.Pattern[str]") -> List[str]:
+    """Split text after every match of ``sentence_end``, dropping empty pieces."""
+    sentences = []
+    start = 0
+    for match in sentence_end.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    sentences.append(text[start:])
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+def split_tts_chunks(text: str, lang: str, max_chars: int = TTS_STREAM_MAX_CHUNK_CHARS,
+                     min_chars: int = TTS_STREAM_MIN_CHUNK_CHARS) -> List[str]:
+    """Split text into sentence-sized chunks using the script's punctuation."""
+    sentence_end = DANDA_SENTENCE_END if lang in DANDA_LANGUAGES else SENTENCE_END
+    chunks: List[str] = []
+    for sentence in split_sentences(text.strip(), sentence_end):
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        for clause in _pack_pieces([c.strip() for c in CLAUSE_BOUNDARY.split(sentence) if c.strip()], max_chars):
+            if len(clause) <= max_chars:
+                chunks.append(clause)
+            else:
+                chunks.extend(_pack_pieces(clause.split(), max_chars))
+
+    # Keep the first chunk short for latency, merge later fragments to save round trips
+    merged = chunks[:1]
+    for chunk in chunks[1:]:
+        if not (WORD_CHARACTER.search(chunk) and WORD_CHARACTER.search(merged[-1])):
+            # Punctuation alone has nothing to speak (gTTS refuses it), keep it with its neighbour
+            merged[-1] = f"{merged[-1]} {chunk}"
+        elif len(merged) > 1 and len(merged[-1]) < min_chars and len(merged[-1]) + 1 + len(chunk) <= max_chars:
+            merged[-1] = f"{merged[-1]} {chunk}"
+        else:
+            merged.append(chunk)
+    return merged
+
+def wav_stream_header(channels: int, sample_width: int, sample_rate: int) -> bytes:
+    """RIFF header with unknown (maximum) sizes, for WAV streamed as it is produced."""
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, channels, sample_rate,
+        byte_rate, channels * sample_width, sample_width * 8, b"data", 0xFFFFFFFF,
+    )
+
+def wav_pcm(audio: bytes) -> Tuple[Tuple[int, int, int], bytes]:
+    """Split a WAV file into ((channels, sample width, rate), PCM frames)."""
+    with wave.open(io.BytesIO(audio)) as wav:
+        params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+        return params, wav.readframes(wav.getnframes())
+
+async def synthesize_stream(backend: TTSBackend, chunks: List[str], lang: str, speaker: Optional[str]):
+    """Yield (chunk index, audio, format) while the next chunk is being synthesized."""
+    if not chunks:
+        return
+    pending = asyncio.ensure_future(synthesize_cached(backend, chunks[0], lang, speaker))
+    try:
+        for index in range(len(chunks)):
+            audio, audio_format, _ = await pending
+            if index + 1 < len(chunks):
+                pending = asyncio.ensure_future(synthesize_cached(backend, chunks[index + 1], lang, speaker))
+            yield index, audio, audio_format
+    finally:
+        if not pending.done():
+            pending.cancel()
+
+async def stream_speech_body(backend: TTSBackend, chunks: List[str], lang: str, speaker: Optional[str], started: float):
+    """Chunked HTTP body: concatenated MP3 frames, or one WAV header followed by PCM."""
+    header_sent = False
+    async for index, audio, audio_format in synthesize_stream(backend, chunks, lang, speaker):
+        if index == 0:
+            tts_time_to_first_audio.observe(time.perf_counter() - started, transport="http", engine=backend.name)
+        if audio_format == "wav":
+            params, audio = wav_pcm(audio)
+            if not header_sent:
+                yield wav_stream_header(*params)
+                header_sent = True
+        yield audio
 
 @app.post("/tts")
 async def text_to_speech(
+    request: Request,
     text: str = Form(...),
     lang: str = Form("en"),
-    speaker: Optional[str] = Form(None)
+    speaker: Optional[str] = Form(None),
+    stream: bool = Form(False),
+    backend: Optional[str] = Form(None)
 ):
     """
     Convert text to speech with multi-language support.
@@ -200,6 +1853,8 @@ async def text_to_speech(
     - **text**: Text to convert to speech
     - **lang**: Language code
     - **speaker**: Speaker ID for multi-speaker models (optional)
+    - **stream**: Send audio sentence by sentence as it is synthesized (optional)
+    - **backend**: TTS engine (gtts, pyttsx3 or coqui); defaults per language (optional)
     """
     if not text:
         raise HTTPException(status_code=400, detail="No text provided")
@@ -210,40 +1865,91 @@ async def text_to_speech(
     try:
         logger.info(f"Generating speech for text: {sanitize_for_log(text[:50])}... (lang: {sanitize_for_log(lang)})")
 
-        if TTS_LIB == 'gtts':
-            tts = gTTS(text=text, lang=lang)
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                temp_path = temp_file.name
-            tts.save(temp_path)
-            with open(temp_path, "rb") as audio_file:
-                audio_data = audio_file.read()
-            os.unlink(temp_path)
+        tts_backend = select_tts_backend(lang, backend)
+        audio_format = tts_backend.audio_format
+        filename = f"speech_{lang}.{audio_format}"
+
+        if stream:
             return StreamingResponse(
-                io.BytesIO(audio_data),
-                media_type="audio/mpeg",
-                headers={"Content-Disposition": f"attachment; filename=speech_{lang}.mp3"}
+                stream_speech_body(tts_backend, split_tts_chunks(text, lang), lang, speaker, time.perf_counter()),
+                media_type=AUDIO_MEDIA_TYPES[audio_format],
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
             )
-        elif TTS_LIB == 'pyttsx3':
-            engine = pyttsx3.init()
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_path = temp_file.name
-            engine.save_to_file(text, temp_path)
-            engine.runAndWait()
-            with open(temp_path, "rb") as audio_file:
-                audio_data = audio_file.read()
-            os.unlink(temp_path)
-            return StreamingResponse(
-                io.BytesIO(audio_data),
-                media_type="audio/wav",
-                headers={"Content-Disposition": f"attachment; filename=speech_{lang}.wav"}
+
+        key = tts_cache_key(text, lang, speaker, tts_backend.name, audio_format)
+        if etag_matches(request, f'"{key}"'):
+            # The key is derived from the request alone; a POST gets 412 rather than 304
+            raise HTTPException(
+                status_code=412,
+                detail="If-None-Match matches the requested audio",
+                headers={"ETag": f'"{key}"'},
             )
-        else:
-            raise HTTPException(status_code=503, detail="No TTS library available")
 
+        audio_data, audio_format, key = await synthesize_cached(tts_backend, text, lang, speaker)
+        return audio_response(request, audio_data, audio_format, key, filename)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"TTS processing failed: {e}")
         raise HTTPException(status_code=500, detail=f"Text-to-speech failed: {str(e)}")
 
+@app.websocket("/ws/tts")
+async def websocket_tts_endpoint(websocket: WebSocket):
+    """Streaming TTS over a WebSocket.
+
+    Each JSON message ``{"text": ..., "lang": ..., "speaker": ..., "backend": ...}`` is answered
+    with one binary message per synthesized chunk (a complete MP3 or WAV file),
+    followed by ``{"type": "end", ...}``.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            text = str(message.get("text") or "")
+            lang = message.get("lang", "en")
+            speaker = message.get("speaker")
+            if not text or lang not in SUPPORTED_LANGUAGES:
+                await websocket.send_json({"type": "error", "detail": "Missing text or unsupported language"})
+                continue
+
+            started = time.perf_counter()
+            chunks = split_tts_chunks(text, lang)
+            first_audio = None
+            try:
+                tts_backend = select_tts_backend(lang, message.get("backend"))
+                async for index, audio, audio_format in synthesize_stream(tts_backend, chunks, lang, speaker):
+                    if index == 0:
+                        first_audio = time.perf_counter() - started
+                        tts_time_to_first_audio.observe(first_audio, transport="websocket", engine=tts_backend.name)
+                    await websocket.send_json({"type": "chunk", "index": index, "text": chunks[index], "format": audio_format})
+                    await websocket.send_bytes(audio)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+                continue
+            await websocket.send_json({
+                "type": "end",
+                "chunks": len(chunks),
+                "time_to_first_audio": first_audio,
+                "duration": time.perf_counter() - started,
+            })
+    except WebSocketDisconnect:
+        logger.info("TTS WebSocket disconnected")
+    except Exception as e:
+        logger.error(f"TTS WebSocket error: {e}")
+        await websocket.close(code=1011, reason=str(e)[:120])
+
+@app.get("/tts/cache/{key}")
+async def get_cached_speech(key: str, request: Request):
+    """Fetch previously synthesized audio by its cache key (the /tts ETag)."""
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        raise HTTPException(status_code=404, detail="Unknown audio key")
+    cached = await asyncio.to_thread(tts_cache.get, key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Audio is no longer cached")
+    audio, audio_format = cached
+    return audio_response(request, audio, audio_format, key, f"speech.{audio_format}")
+
 @app.get("/languages")
 async def get_supported_languages():
     """Get list of supported languages."""
@@ -262,9 +1968,96 @@ async def health_check():
         "gtts_available": GTTS_AVAILABLE,
         "pyttsx3_available": PYTTSX3_AVAILABLE,
         "tts_lib": TTS_LIB,
-        "supported_languages": list(SUPPORTED_LANGUAGES.keys())
+        "tts_backends": {name: backend.available() for name, backend in TTS_BACKENDS.items()},
+        "supported_languages": list(SUPPORTED_LANGUAGES.keys()),
+        "inference": {**inference.stats(), "coqui": coqui_pool.stats()},
+        "whisper_workers": {size: pool.stats() for size, pool in whisper_workers.items()},
+        "pyttsx3_pool": pyttsx3_pool.stats() if pyttsx3_pool is not None else None,
+        "stream_scheduler": stream_scheduler.stats(),
+        "ready": readiness.ready
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving the event loop."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until worker pools are up and preloaded models are warm."""
+    state = readiness.describe()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up" if readiness.finished_at is None else "not_ready", **state})
+    return {"status": "ready", **state}
+
+@app.get("/stats")
+async def get_stats():
+    """Runtime metrics collected by the service."""
+    return {"metrics": metrics_snapshot(), "models": model_registry.describe(), "imports": import_report(), "tts_cache": tts_cache.stats()}
+
+# Prometheus export
+#
+# Gauges describing live objects (queues, executors, caches, memory) are read
+# off those objects when /metrics is scraped rather than kept up to date on
+# every job, so request paths only pay for their counters and stage timings.
+
+queue_depth_gauge = Gauge("queue_depth", "Jobs accepted but not yet started", ("queue",))
+executor_occupancy_gauge = Gauge("executor_occupancy_ratio", "Busy workers divided by workers", ("executor",))
+cache_hit_ratio_gauge = Gauge("cache_hit_ratio", "Cache hits divided by lookups since start", ("cache",))
+model_memory_gauge = Gauge("model_memory_bytes", "Memory held by loaded models, and the configured budget", ("kind",))
+process_memory_gauge = Gauge("process_resident_memory_bytes", "Resident set size of the API process")
+
+def _model_cache_hit_ratio() -> float:
+    results = {sample["labels"]["result"]: sample["value"] for sample in model_cache_requests_total.snapshot()}
+    lookups = sum(results.values())
+    return results.get("hit", 0) / lookups if lookups else 0.0
+
+def _process_resident_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def collect_runtime_metrics():
+    """Refresh the gauges read off live objects; called once per scrape."""
+    pools = {"inference_thread": inference.threads, "inference_process": inference.processes, "coqui": coqui_pool}
+    for name, pool in pools.items():
+        if pool is None:
+            continue
+        running = min(pool.pending, pool.workers)
+        queue_depth_gauge.set(pool.pending - running, queue=name)
+        executor_occupancy_gauge.set(running / pool.workers, executor=name)
+    for model_size, pool in whisper_workers.items():
+        stats = pool.stats()
+        queue_depth_gauge.set(stats["pending"] - stats["running"], queue=f"whisper_{model_size}")
+        executor_occupancy_gauge.set(stats["running"] / max(stats["workers"], 1), executor=f"whisper_{model_size}")
+    if pyttsx3_pool is not None:
+        stats = pyttsx3_pool.stats()
+        queue_depth_gauge.set(stats["pending"], queue="pyttsx3")
+        executor_occupancy_gauge.set(stats["busy"] / max(stats["size"], 1), executor="pyttsx3")
+    if whisper_batcher is not None:
+        queue_depth_gauge.set(whisper_batcher.pending, queue="whisper_batch")
+    stats = stream_scheduler.stats()
+    queue_depth_gauge.set(stats["waiting"], queue="stt_stream")
+    executor_occupancy_gauge.set(stats["running"] / max(stats["slots"], 1), executor="stt_stream")
+
+    cache_hit_ratio_gauge.set(tts_cache.stats()["hit_rate"], cache="tts")
+    cache_hit_ratio_gauge.set(_model_cache_hit_ratio(), cache="model")
+
+    models = model_registry.describe()
+    model_memory_gauge.set(models["resident_bytes"], kind="resident")
+    model_memory_gauge.set(models["memory_budget_bytes"], kind="budget")
+    resident = _process_resident_bytes()
+    if resident is not None:
+        process_memory_gauge.set(resident)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Metrics in the Prometheus text format."""
+    collect_runtime_metrics()
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/detect-language")
 async def detect_audio_language(file: UploadFile = File(...)):
     """Detect the language of an audio file."""
@@ -272,8 +2065,9 @@ async def detect_audio_language(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="No audio file provided")
 
     try:
-        audio_data = await file.read()
-        detected_lang = detect_language(audio_data)
+        contents = await file.read()
+        samples = await inference.run_in_thread(ingest_audio, contents)
+        detected_lang = await inference.run_in_thread(detect_language, samples)
 
         return {
             "detected_language": detected_lang,
@@ -281,6 +2075,8 @@ async def detect_audio_language(file: UploadFile = File(...)):
             "confidence": 0.8  # Placeholder confidence
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Language detection failed: {e}")
         raise HTTPException(status_code=500, detail=f"Language detection failed: {str(e)}")
@@ -295,23 +2091,46 @@ async def speech_to_text(
         raise HTTPException(status_code=400, detail="No audio file provided")
 
     try:
-        audio_data = validate_and_convert_audio(file)
+        samples = await inference.run_in_thread(validate_and_convert_audio, file)
 
-        if not lang or use_auto_detection:
-            detected_lang = detect_language(audio_data)
-            if not lang:
-                lang = detected_lang
-            logger.info(f"Using language: {sanitize_for_log(lang)} (detected: {sanitize_for_log(detected_lang)})")
+        analysis = AudioAnalysis(samples)
 
-        if lang not in SUPPORTED_LANGUAGES:
+        if lang and lang not in SUPPORTED_LANGUAGES:
             raise HTTPException(status_code=400, detail=f"Unsupported language: {lang}")
 
-        audio_array = preprocess_audio(audio_data)
-
-        model = get_whisper_model(lang)
+        decision = PreprocessingDecision(analysis.quality)
+        decision.record()
+        if decision.reject_reason:
+            raise HTTPException(status_code=422, detail=decision.reject_reason)
+        if decision.denoise:
+            started = time.perf_counter()
+            # Timed here: with INFERENCE_PROCESS_WORKERS the work runs in a child whose metrics never reach /metrics
+            with time_stage("denoise", backend="process" if inference.processes else "thread"):
+                audio_array = await inference.run_in_process(preprocess_audio, samples)
+            denoise_cost.record(time.perf_counter() - started, analysis.quality.duration)
+        elif decision.normalize:
+            audio_array = peak_normalize(samples)
+        else:
+            audio_array = samples
+
+        detect = not lang or use_auto_detection
+        if detect and len(audio_array) <= WHISPER_WINDOW_SAMPLES:
+            # One log-mel spectrogram serves both detection and decoding
+            result = await transcribe_and_detect(audio_array, lang if lang != "en" else None)
+            detected_lang = result["detected_language"]
+            lang = lang or detected_lang
+            logger.info(f"Transcribed with Whisper ({sanitize_for_log(lang)}, detected: {sanitize_for_log(detected_lang)})")
+        else:
+            if detect:
+                detected_lang = await inference.run_in_thread(lambda: analysis.detected_language)
+                if not lang:
+                    lang = detected_lang
+                logger.info(f"Using language: {sanitize_for_log(lang)} (detected: {sanitize_for_log(detected_lang)})")
+            else:
+                detected_lang = lang
 
-        logger.info(f"Transcribing audio with Whisper ({lang})")
-        result = model.transcribe(audio_array, language=lang if lang != "en" else None)
+            logger.info(f"Transcribing audio with Whisper ({lang})")
+            result = await transcribe_audio(audio_array, lang, language=lang if lang != "en" else None)
 
         transcription = result["text"].strip()
         confidence = result.get("confidence", 0.8)
@@ -322,62 +2141,970 @@ async def speech_to_text(
             "text": transcription,
             "language": lang,
             "confidence": confidence,
-            "detected_language": detect_language(audio_data) if use_auto_detection else lang
+            "detected_language": detected_lang if use_auto_detection else lang,
+            "preprocessing": decision.describe()
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"STT processing failed: {e}")
         raise HTTPException(status_code=500, detail=f"Speech-to-text failed: {str(e)}")
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-
 # Real-time WebSocket support for streaming audio transcription
+#
+# A session may open with a JSON handshake announcing its audio format:
+#   {"type": "start", "encoding": "pcm_s16le", "sample_rate": 16000, "channels": 1}
+# where encoding is pcm_s16le, pcm_f32le or opus (one Opus packet per binary
+# message, needs opuslib). Sessions that send audio without a handshake are
+# treated as 16 kHz 16-bit mono PCM. PCM frames are viewed with np.frombuffer and
+# written straight into a preallocated per-session ring buffer; 16 kHz mono needs
+# no other copy, other rates and channel counts are downmixed and resampled.
+#
+# Receiving and decoding run as separate tasks, so audio keeps arriving while
+# Whisper works. The ring holds the utterance in progress plus at most
+# STT_STREAM_MAX_BACKLOG_SECONDS of audio not yet looked at; memory per
+# connection is fixed by that size. The server sends {"type": "pause"} once the
+# backlog reaches STT_STREAM_PAUSE_BACKLOG_SECONDS and {"type": "resume"} with
+# the remaining credit in seconds when it drops to
+# STT_STREAM_RESUME_BACKLOG_SECONDS. Audio that arrives while the backlog is
+# full is handled by STT_STREAM_OVERFLOW_POLICY: "drop_oldest" skips the oldest
+# backlog to stay close to real time, "reject" refuses the new frames and answers
+# each one with {"type": "overflow"} so the client can resend it after "resume".
+#
+# With STT_STREAM_DENOISE on, each session runs its own StreamingDenoiser as
+# audio enters the ring, so the VAD and every decode see denoised audio and
+# decodes only need a peak normalization. Turned off, PCM frames reach the ring
+# without any intermediate copy.
+#
+# An energy-based voice activity detector cuts the ring into utterances and only
+# speech is sent to Whisper: each utterance is transcribed as soon as
+# STT_VAD_END_SILENCE_MS of silence follows it (or it reaches
+# STT_VAD_MAX_SEGMENT_SECONDS), and silence is never decoded. A text message
+# "flush" (or {"type": "flush"}) transcribes any utterance still in progress.
+
+STT_STREAM_MAX_BACKLOG_SECONDS = float(os.getenv("STT_STREAM_MAX_BACKLOG_SECONDS", "4"))
+STT_STREAM_PAUSE_BACKLOG_SECONDS = float(os.getenv("STT_STREAM_PAUSE_BACKLOG_SECONDS", "3"))
+STT_STREAM_RESUME_BACKLOG_SECONDS = float(os.getenv("STT_STREAM_RESUME_BACKLOG_SECONDS", "1"))
+STT_STREAM_OVERFLOW_POLICY = os.getenv("STT_STREAM_OVERFLOW_POLICY", "drop_oldest")
+STT_STREAM_DENOISE = os.getenv("STT_STREAM_DENOISE", "1") != "0"
+
+STT_VAD_FRAME_MS = int(os.getenv("STT_VAD_FRAME_MS", "30"))
+STT_VAD_THRESHOLD_DB = float(os.getenv("STT_VAD_THRESHOLD_DB", "9"))
+STT_VAD_MIN_ENERGY_DB = float(os.getenv("STT_VAD_MIN_ENERGY_DB", "-50"))
+STT_VAD_END_SILENCE_MS = int(os.getenv("STT_VAD_END_SILENCE_MS", "500"))
+STT_VAD_PREROLL_MS = int(os.getenv("STT_VAD_PREROLL_MS", "200"))
+STT_VAD_MIN_SPEECH_MS = int(os.getenv("STT_VAD_MIN_SPEECH_MS", "250"))
+STT_VAD_MAX_SEGMENT_SECONDS = float(os.getenv("STT_VAD_MAX_SEGMENT_SECONDS", "25"))
+
+OPUS_AVAILABLE = importlib.util.find_spec("opuslib") is not None
+
+stt_vad_audio_seconds = Counter("stt_vad_audio_seconds_total", "Streamed audio classified by the VAD", ("kind",))
+stream_overflow_seconds = Counter(
+    "stt_stream_overflow_seconds_total", "Streamed audio lost because a session's backlog was full", ("action",)
+)
+stream_flow_messages = Counter("stt_stream_flow_messages_total", "Flow-control messages sent to clients", ("type",))
+
+class AudioRingBuffer:
+    """Preallocated float32 ring addressed by absolute sample position in the stream."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self.end = 0  # Stream position one past the newest sample
+
+    @property
+    def start(self) -> int:
+        """Oldest stream position still held."""
+        return max(0, self.end - self.capacity)
+
+    def write(self, samples: np.ndarray, scale: float = 1.0) -> int:
+        """Append samples of any numeric dtype, scaling them as they are stored."""
+        count = len(samples)
+        if count > self.capacity:
+            self.end += count - self.capacity
+            samples = samples[-self.capacity:]
+        offset = self.end % self.capacity
+        first = min(len(samples), self.capacity - offset)
+        np.multiply(samples[:first], scale, out=self._buffer[offset:offset + first], casting="unsafe")
+        np.multiply(samples[first:], scale, out=self._buffer[:len(samples) - first], casting="unsafe")
+        self.end += len(samples)
+        return count
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Copy of the samples between two stream positions, clipped to what is held."""
+        start, stop = max(start, self.start), min(stop, self.end)
+        if stop <= start:
+            return np.empty(0, dtype=np.float32)
+        first, last = start % self.capacity, stop % self.capacity
+        if first < last or last == 0:
+            return self._buffer[first:last or self.capacity].copy()
+        return np.concatenate((self._buffer[first:], self._buffer[:last]))
+
+class StreamAudioDecoder:
+    """Turns the binary frames of one session into 16 kHz mono samples for the ring."""
+
+    ENCODINGS = {"pcm_s16le": ("<i2", 1.0 / 32768.0), "pcm_f32le": ("<f4", 1.0), "opus": ("<i2", 1.0 / 32768.0)}
+    OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+    def __init__(self, encoding: str = "pcm_s16le", sample_rate: int = TARGET_SAMPLE_RATE, channels: int = 1):
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"Unsupported encoding '{encoding}'. Supported: {', '.join(self.ENCODINGS)}")
+        if not 1 <= channels <= 8:
+            raise ValueError(f"Unsupported channel count {channels}")
+        if not 8000 <= sample_rate <= 192000:
+            raise ValueError(f"Unsupported sample rate {sample_rate}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype, self.scale = self.ENCODINGS[encoding]
+        self._frame_bytes = np.dtype(self.dtype).itemsize * channels
+        self._pending = b""
+        self._opus = None
+        self._resampler: Optional[StreamingResampler] = None
+        if encoding == "opus":
+            if not OPUS_AVAILABLE:
+                raise ValueError("Opus streams need opuslib. Install with: pip install opuslib")
+            if sample_rate not in self.OPUS_RATES:
+                raise ValueError(f"Opus sample rate must be one of {self.OPUS_RATES}")
+            # libopus decodes straight to 16 kHz, whatever rate the encoder used
+            self.sample_rate = TARGET_SAMPLE_RATE
+            self._opus = lazy_import("opuslib").Decoder(TARGET_SAMPLE_RATE, channels)
+        elif sample_rate != TARGET_SAMPLE_RATE:
+            # Frames are resampled as they arrive, keeping filter state between them
+            self._resampler = StreamingResampler(sample_rate)
+
+    @classmethod
+    def from_handshake(cls, message: Dict[str, Any]) -> "StreamAudioDecoder":
+        try:
+            return cls(
+                str(message.get("encoding", "pcm_s16le")),
+                int(message.get("sample_rate", TARGET_SAMPLE_RATE)),
+                int(message.get("channels", 1)),
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid stream format: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {"encoding": self.encoding, "sample_rate": self.sample_rate, "channels": self.channels}
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """Samples for one frame: a view of ``data`` when it is already 16 kHz mono.
+
+        The result still has to be multiplied by ``scale``; the ring does that
+        while copying, so the common case never allocates.
+        """
+        if self._opus is not None:
+            # 120 ms is the longest frame an Opus packet can hold
+            data = self._opus.decode(data, TARGET_SAMPLE_RATE * 120 // 1000)
+        elif self._pending or len(data) % self._frame_bytes:
+            # Frames may split a sample; carry the partial one into the next message
+            data = self._pending + data
+            usable = len(data) - len(data) % self._frame_bytes
+            data, self._pending = data[:usable], data[usable:]
+        samples = np.frombuffer(data, dtype=self.dtype)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return samples
+
+    def flush(self) -> np.ndarray:
+        """Samples still held by the resampler at the end of the input, unscaled like ``decode``."""
+        if self._resampler is None:
+            return np.zeros(0, dtype=np.float32)
+        return self._resampler.flush()
+
+class SpeechSegment:
+    """One utterance found by the VAD, with its position in the stream in seconds."""
+
+    def __init__(self, audio: np.ndarray, start: float, end: float):
+        self.audio = audio
+        self.start = start
+        self.end = end
+
+class EnergyVAD:
+    """Frame-energy voice activity detector with an adaptive noise floor.
+
+    Works on stream positions in the session's ring buffer, so utterances are
+    read out of the ring once when they are decoded instead of being collected
+    frame by frame.
+    """
 
-executor = ThreadPoolExecutor(max_workers=2)
+    def __init__(self, ring: AudioRingBuffer, sample_rate: int = TARGET_SAMPLE_RATE):
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * STT_VAD_FRAME_MS // 1000
+        self.end_silence_frames = max(1, STT_VAD_END_SILENCE_MS // STT_VAD_FRAME_MS)
+        self.min_speech_frames = max(1, STT_VAD_MIN_SPEECH_MS // STT_VAD_FRAME_MS)
+        self.max_segment_samples = int(STT_VAD_MAX_SEGMENT_SECONDS * sample_rate)
+        self.preroll_samples = max(1, STT_VAD_PREROLL_MS // STT_VAD_FRAME_MS) * self.frame_length
+        self._position = 0  # First stream position not yet classified
+        self._noise_floor_db: Optional[float] = None
+        self._segment_start: Optional[int] = None
+        self._segment_floor = 0  # Utterances never reach back into the previous one
+        self._last_speech_end = 0
+        self._speech_frames = 0
+        self._silence_frames = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._segment_start is not None
+
+    @property
+    def position(self) -> int:
+        """First stream position not yet classified."""
+        return self._position
+
+    @property
+    def current_length(self) -> int:
+        """Samples in the utterance in progress."""
+        return 0 if self._segment_start is None else self._position - self._segment_start
+
+    @property
+    def current_start(self) -> float:
+        """Stream position (seconds) where the utterance in progress starts."""
+        return (self._segment_start or 0) / self.sample_rate
+
+    def current_audio(self) -> np.ndarray:
+        """Audio of the utterance in progress, empty when there is none."""
+        if self._segment_start is None:
+            return np.empty(0, dtype=np.float32)
+        return self.ring.read(self._segment_start, self._position)
+
+    def consume(self, samples: int):
+        """Drop already transcribed audio from the front of the utterance in progress."""
+        if self._segment_start is not None:
+            self._segment_start = min(self._segment_start + samples, self._position)
+
+    def frame_energies_db(self, frames: np.ndarray) -> np.ndarray:
+        return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+    def process(self) -> List[SpeechSegment]:
+        """Classify audio written to the ring since the last call; returns utterances that ended in it."""
+        self._position = max(self._position, self.ring.start)
+        available = self.ring.end - self._position
+        usable = available - available % self.frame_length
+        if not usable:
+            return []
+        frames = self.ring.read(self._position, self._position + usable).reshape(-1, self.frame_length)
+        energies = self.frame_energies_db(frames)
+
+        completed = []
+        speech_count = 0
+        for index, energy in enumerate(energies):
+            frame_start = self._position + index * self.frame_length
+            frame_end = frame_start + self.frame_length
+            floor = energy if self._noise_floor_db is None else self._noise_floor_db
+            is_speech = energy > max(floor + STT_VAD_THRESHOLD_DB, STT_VAD_MIN_ENERGY_DB)
+            if not is_speech:
+                # Track the floor quickly downwards and slowly upwards
+                rate = 0.3 if energy < floor else 0.02
+                self._noise_floor_db = floor + rate * (energy - floor)
+            speech_count += int(is_speech)
+
+            if self._segment_start is not None:
+                if is_speech:
+                    self._speech_frames += 1
+                    self._silence_frames = 0
+                    self._last_speech_end = frame_end
+                else:
+                    self._silence_frames += 1
+                if (self._silence_frames >= self.end_silence_frames
+                        or frame_end - self._segment_start >= self.max_segment_samples):
+                    segment = self._close_segment(frame_end)
+                    if segment is not None:
+                        completed.append(segment)
+            elif is_speech:
+                self._segment_start = max(frame_start - self.preroll_samples, self._segment_floor, self.ring.start)
+                self._last_speech_end = frame_end
+                self._speech_frames = 1
+                self._silence_frames = 0
+
+        self._position += usable
+        frame_seconds = self.frame_length / self.sample_rate
+        stt_vad_audio_seconds.inc(speech_count * frame_seconds, kind="speech")
+        stt_vad_audio_seconds.inc((len(frames) - speech_count) * frame_seconds, kind="silence")
+        return completed
+
+    def _close_segment(self, end: int) -> Optional[SpeechSegment]:
+        start, speech_frames = self._segment_start, self._speech_frames
+        # Drop the trailing silence that ended the utterance, keeping a preroll-sized tail
+        end = min(end, self._last_speech_end + self.preroll_samples)
+        self._segment_start, self._speech_frames, self._silence_frames = None, 0, 0
+        self._segment_floor = end
+        if speech_frames < self.min_speech_frames:
+            return None  # Clicks and short noise bursts are not worth a decode
+        return SpeechSegment(self.ring.read(start, end), start / self.sample_rate, end / self.sample_rate)
+
+    def skip(self, position: int) -> Optional[SpeechSegment]:
+        """Jump ahead to ``position`` without classifying the audio in between.
+
+        An utterance in progress is closed where classification stopped, so
+        the speech heard so far is still transcribed.
+        """
+        segment = self._close_segment(self._position) if self._segment_start is not None else None
+        self._position = max(self._position, position)
+        self._segment_floor = self._position
+        return segment
+
+    def flush(self) -> Optional[SpeechSegment]:
+        """End of stream: close any utterance still in progress."""
+        end = self.ring.end
+        self._position = end
+        if self._segment_start is None:
+            return None
+        return self._close_segment(end)
+
+def first_speech_window(samples: np.ndarray, length: int) -> np.ndarray:
+    """View of ``length`` samples starting just before the first speech in ``samples``.
+
+    Scans block by block with the VAD's energy thresholds and stops at the
+    first block containing speech, so long files cost no more than short ones.
+    Returns the start of the buffer when no speech is found.
+    """
+    frame_length = TARGET_SAMPLE_RATE * STT_VAD_FRAME_MS // 1000
+    preroll = max(1, STT_VAD_PREROLL_MS // STT_VAD_FRAME_MS) * frame_length
+    for block_start in range(0, len(samples) - frame_length + 1, length):
+        block = samples[block_start:block_start + length]
+        frames = block[:len(block) - len(block) % frame_length].reshape(-1, frame_length)
+        energies = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        floor = np.percentile(energies, 10)
+        speech = np.flatnonzero(energies > max(floor + STT_VAD_THRESHOLD_DB, STT_VAD_MIN_ENERGY_DB))
+        if not speech.size and floor > STT_VAD_MIN_ENERGY_DB:
+            speech = np.zeros(1, dtype=int)  # Loud throughout, speech from the first frame
+        if speech.size:
+            start = max(0, block_start + int(speech[0]) * frame_length - preroll)
+            return samples[start:start + length]
+    return samples[:length]
+
+# Incremental hypotheses
+#
+# While an utterance is in progress its audio is re-decoded every
+# STT_PARTIAL_INTERVAL_MS and sent as a partial result. Utterances longer than
+# STT_STREAM_WINDOW_SECONDS are committed window by window: Whisper segments
+# ending before the last STT_STREAM_OVERLAP_SECONDS become final and the overlap
+# is decoded again with the next window, so words at window edges are not lost.
+# The committed text is passed back as the prompt for the following decodes.
+#
+# Every decode of a session uses one fixed language: the "lang" of the start
+# message, or, without one (or with "auto"), the language Whisper detects once
+# on the session's first utterance, kept as Whisper's own code when it is not a
+# supported language. Detection runs when that utterance ends or reaches
+# STT_STREAM_DETECT_SECONDS, and no partials are sent before it.
+
+STT_PARTIAL_INTERVAL_MS = int(os.getenv("STT_PARTIAL_INTERVAL_MS", "500"))
+STT_STREAM_WINDOW_SECONDS = float(os.getenv("STT_STREAM_WINDOW_SECONDS", "15"))
+STT_STREAM_OVERLAP_SECONDS = float(os.getenv("STT_STREAM_OVERLAP_SECONDS", "1"))
+STT_STREAM_PROMPT_CHARS = int(os.getenv("STT_STREAM_PROMPT_CHARS", "200"))
+STT_STREAM_DETECT_SECONDS = float(os.getenv("STT_STREAM_DETECT_SECONDS", "3"))
+
+stream_languages_counter = Counter(
+    "stt_stream_languages_total", "Streaming sessions by decoding language", ("lang", "source")
+)
+
+def transcript_message(kind: str, text: str, start: float, end: float) -> Dict[str, Any]:
+    return {
+        "type": kind,
+        "text": text,
+        "start": round(start, 3),
+        "end": round(end, 3),
+        "is_final": kind == "final",
+    }
+
+# Stream scheduling
+#
+# Decodes from every /ws/stt session go through one scheduler with
+# STT_STREAM_DECODE_SLOTS concurrent slots. Each session has at most one decode
+# waiting and free slots go to the waiting job with the earliest deadline, so a
+# client that sends audio faster than real time cannot starve the others.
+# Finals must start within STT_STREAM_FINAL_DEADLINE_MS; a partial that is
+# still waiting when the next one is due is dropped, since a newer partial will
+# replace it anyway.
+#
+# Admission is budgeted in real-time factor (decode seconds per second of
+# audio). Each session costs its measured RTF, or STT_STREAM_EXPECTED_RTF until
+# it has streamed STT_STREAM_RTF_WARMUP_SECONDS. A new session that would push
+# the total over STT_STREAM_RTF_BUDGET is admitted without partial results when
+# STT_STREAM_SATURATION_POLICY is "degrade" and that fits, otherwise it is
+# closed with code 1013 (try again later).
+
+STT_STREAM_DECODE_SLOTS = int(os.getenv("STT_STREAM_DECODE_SLOTS", "2"))
+STT_STREAM_RTF_BUDGET = float(os.getenv("STT_STREAM_RTF_BUDGET", str(0.8 * STT_STREAM_DECODE_SLOTS)))
+STT_STREAM_EXPECTED_RTF = float(os.getenv("STT_STREAM_EXPECTED_RTF", "0.25"))
+STT_STREAM_DEGRADED_RTF_RATIO = float(os.getenv("STT_STREAM_DEGRADED_RTF_RATIO", "0.4"))
+STT_STREAM_RTF_WARMUP_SECONDS = float(os.getenv("STT_STREAM_RTF_WARMUP_SECONDS", "5"))
+STT_STREAM_SATURATION_POLICY = os.getenv("STT_STREAM_SATURATION_POLICY", "degrade")
+STT_STREAM_FINAL_DEADLINE_MS = int(os.getenv("STT_STREAM_FINAL_DEADLINE_MS", "1000"))
+
+stream_sessions_gauge = Gauge("stt_stream_sessions", "Open /ws/stt sessions", ("mode",))
+stream_rejected_counter = Counter("stt_stream_rejected_total", "/ws/stt sessions refused by admission control")
+stream_partials_dropped = Counter("stt_stream_partials_dropped_total", "Partial decodes dropped after missing their deadline")
+stream_lag_gauge = Gauge("stt_stream_lag_seconds", "How far a session's processing is behind real time", ("session",))
+stream_queue_wait = Histogram("stt_stream_queue_wait_seconds", "Time stream decodes wait for a slot", ("kind",))
+
+class StreamSaturated(Exception):
+    """Raised when a new stream would exceed the real-time-factor budget."""
+
+class StreamSession:
+    """Scheduling state of one /ws/stt connection."""
+
+    def __init__(self, session_id: str, degraded: bool = False):
+        self.id = session_id
+        self.degraded = degraded
+        self.audio_seconds = 0.0
+        self.lag = 0.0
+        self.decode_seconds = 0.0
+        self.rejected_frames = 0
+        self.rejected_seconds = 0.0
+        self.waiting: Optional[Tuple[float, str, Any]] = None  # (deadline, kind, future)
+
+    @property
+    def partials_enabled(self) -> bool:
+        return not self.degraded
+
+    @property
+    def load(self) -> float:
+        """Share of one decode slot this session needs to keep up with real time."""
+        if self.audio_seconds < STT_STREAM_RTF_WARMUP_SECONDS:
+            expected = STT_STREAM_EXPECTED_RTF
+            return expected * STT_STREAM_DEGRADED_RTF_RATIO if self.degraded else expected
+        return self.decode_seconds / self.audio_seconds
+
+    def received(self, seconds: float):
+        self.audio_seconds += seconds
+
+    def rejected(self, seconds: float):
+        """Record a frame refused by the reject overflow policy."""
+        self.rejected_frames += 1
+        self.rejected_seconds += seconds
+
+    def report_lag(self, seconds: float):
+        """Record how much received audio is still waiting to be looked at."""
+        self.lag = seconds
+        stream_lag_gauge.set(seconds, session=self.id)
+
+class StreamScheduler:
+    """Fair, deadline-ordered access to the decode slots shared by all streams."""
+
+    def __init__(self, slots: int, budget: float, policy: str):
+        self.slots = max(1, slots)
+        self.budget = budget
+        self.policy = policy
+        self.sessions: Dict[str, StreamSession] = {}
+        self._running = 0
+        self._ids = itertools.count(1)
+
+    def load(self) -> float:
+        return sum(session.load for session in self.sessions.values())
+
+    def open(self) -> StreamSession:
+        """Admit a new stream, degraded or not, or raise StreamSaturated."""
+        load = self.load()
+        if load + STT_STREAM_EXPECTED_RTF <= self.budget:
+            degraded = False
+        elif (self.policy == "degrade"
+              and load + STT_STREAM_EXPECTED_RTF * STT_STREAM_DEGRADED_RTF_RATIO <= self.budget):
+            degraded = True
+        else:
+            stream_rejected_counter.inc()
+            raise StreamSaturated(f"Streaming capacity exhausted (load {load:.2f} of {self.budget:.2f})")
+        session = StreamSession(str(next(self._ids)), degraded)
+        self.sessions[session.id] = session
+        self._update_gauges()
+        return session
+
+    def close(self, session: StreamSession):
+        self.sessions.pop(session.id, None)
+        if session.waiting is not None and not session.waiting[2].done():
+            session.waiting[2].cancel()
+        session.waiting = None
+        stream_lag_gauge.remove(session=session.id)
+        self._update_gauges()
+        if session.rejected_frames:
+            logger.info(f"Stream {session.id} closed after rejecting {session.rejected_frames} frames "
+                        f"({session.rejected_seconds:.2f}s of audio)")
+
+    def _update_gauges(self):
+        degraded = sum(1 for session in self.sessions.values() if session.degraded)
+        stream_sessions_gauge.set(len(self.sessions) - degraded, mode="full")
+        stream_sessions_gauge.set(degraded, mode="degraded")
+
+    async def run(self, session: StreamSession, kind: str, fn, *args, **kwargs):
+        """Run one decode for a session once a slot is free.
+
+        Returns None for a partial that missed its deadline while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        enqueued = time.monotonic()
+        deadline_ms = STT_PARTIAL_INTERVAL_MS if kind == "partial" else STT_STREAM_FINAL_DEADLINE_MS
+        future = loop.create_future()
+        session.waiting = (enqueued + deadline_ms / 1000, kind, future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                # Cancelled after being handed a slot; give it to someone else
+                self._running -= 1
+                self._dispatch()
+            elif session.waiting is not None and session.waiting[2] is future:
+                session.waiting = None
+            raise
+        if future.result() is False:
+            stream_partials_dropped.inc()
+            return None
+
+        started = time.monotonic()
+        stream_queue_wait.observe(started - enqueued, kind=kind)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            session.decode_seconds += time.monotonic() - started
+            self._running -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._running < self.slots:
+            waiting = [session for session in self.sessions.values() if session.waiting is not None]
+            if not waiting:
+                return
+            session = min(waiting, key=lambda candidate: candidate.waiting[0])
+            deadline, kind, future = session.waiting
+            session.waiting = None
+            if future.done():
+                continue
+            if kind == "partial" and deadline < now:
+                future.set_result(False)
+                continue
+            self._running += 1
+            future.set_result(True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "running": self._running,
+            "waiting": sum(1 for session in self.sessions.values() if session.waiting is not None),
+            "sessions": len(self.sessions),
+            "degraded_sessions": sum(1 for session in self.sessions.values() if session.degraded),
+            "rtf_load": round(self.load(), 3),
+            "rtf_budget": self.budget,
+        }
+
+stream_scheduler = StreamScheduler(STT_STREAM_DECODE_SLOTS, STT_STREAM_RTF_BUDGET, STT_STREAM_SATURATION_POLICY)
+
+class StreamingTranscriber:
+    """Per-connection sliding-window decoder producing partial and final results."""
+
+    def __init__(self, lang: Optional[str] = None, decoder: Optional[StreamAudioDecoder] = None,
+                 session: Optional[StreamSession] = None):
+        self.lang = lang  # None until detected on the first utterance
+        if lang is not None:
+            stream_languages_counter.inc(lang=lang, source="handshake")
+        self.decoder = decoder or StreamAudioDecoder()
+        self.session = session
+        # Room for the longest utterance plus the largest backlog allowed
+        self.max_backlog = int(STT_STREAM_MAX_BACKLOG_SECONDS * TARGET_SAMPLE_RATE)
+        self.ring = AudioRingBuffer(int(STT_VAD_MAX_SEGMENT_SECONDS * TARGET_SAMPLE_RATE) + self.max_backlog)
+        self.vad = EnergyVAD(self.ring)
+        self.denoiser = StreamingDenoiser() if STT_STREAM_DENOISE else None
+        self._segments: List[SpeechSegment] = []
+        self.prompt = ""
+        self._samples_since_partial = 0
+        self._partial_interval = TARGET_SAMPLE_RATE * STT_PARTIAL_INTERVAL_MS // 1000
+        self._window = int(STT_STREAM_WINDOW_SECONDS * TARGET_SAMPLE_RATE)
+        self._overlap = int(STT_STREAM_OVERLAP_SECONDS * TARGET_SAMPLE_RATE)
+        self._detect_length = int(STT_STREAM_DETECT_SECONDS * TARGET_SAMPLE_RATE)
+
+    async def _schedule(self, kind: str, fn, *args, **kwargs):
+        if self.session is None:
+            return await fn(*args, **kwargs)
+        return await stream_scheduler.run(self.session, kind, fn, *args, **kwargs)
+
+    async def _transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        audio_array = peak_normalize(audio)
+        if self.prompt:
+            options["initial_prompt"] = self.prompt
+        return await transcribe_audio(audio_array, self.lang, language=self.lang, **options)
+
+    async def _decode(self, audio: np.ndarray, kind: str = "final", **options) -> Optional[Dict[str, Any]]:
+        return await self._schedule(kind, self._transcribe, audio, **options)
+
+    async def _detect_language(self, audio: np.ndarray) -> Dict[str, Any]:
+        """Fix the session language from its first utterance."""
+        raw_lang = await self._schedule("final", inference.run_in_thread, detect_raw_language_from_array, audio)
+        # Unsupported languages are decoded as themselves, not forced to English
+        self.lang = decoding_language(raw_lang)
+        stream_languages_counter.inc(lang=self.lang, source="detected")
+        logger.info(f"Stream language detected: {sanitize_for_log(self.lang)}")
+        return {"type": "language", "lang": self.lang}
+
+    def _remember(self, text: str):
+        if text:
+            self.prompt = f"{self.prompt} {text}".strip()[-STT_STREAM_PROMPT_CHARS:]
+
+    async def _final(self, segment: SpeechSegment) -> List[Dict[str, Any]]:
+        messages = []
+        if self.lang is None:
+            messages.append(await self._detect_language(segment.audio))
+        text = (await self._decode(segment.audio))["text"].strip()
+        self._remember(text)
+        if text:
+            messages.append(transcript_message("final", text, segment.start, segment.end))
+        return messages
+
+    async def _commit_window(self) -> Optional[Dict[str, Any]]:
+        """Finalize the start of a long utterance, keeping the overlap for the next window."""
+        audio = self.vad.current_audio()[:self._window]
+        start = self.vad.current_start
+        result = await self._decode(audio)
+        cutoff_samples = len(audio) - self._overlap
+        cutoff = cutoff_samples / TARGET_SAMPLE_RATE
+        segments = [segment for segment in result.get("segments", []) if segment["end"] <= cutoff]
+        if segments:
+            committed_seconds = segments[-1]["end"]
+            text = "".join(segment["text"] for segment in segments).strip()
+        else:
+            # No segment boundary before the overlap (batched decodes carry no
+            # segments at all): decode exactly the audio being consumed instead
+            committed_seconds = cutoff
+            text = (await self._decode(audio[:cutoff_samples]))["text"].strip()
+        self.vad.consume(int(committed_seconds * TARGET_SAMPLE_RATE))
+        self._remember(text)
+        return transcript_message("final", text, start, start + committed_seconds) if text else None
+
+    @property
+    def backlog(self) -> int:
+        """Samples received but not yet looked at by the VAD."""
+        return self.ring.end - self.vad.position
+
+    def write(self, data: bytes) -> Optional[float]:
+        """Store one binary frame; the seconds of audio refused by the reject policy, or None."""
+        samples = self.decoder.decode(data)
+        if STT_STREAM_OVERFLOW_POLICY == "reject" and self.backlog + len(samples) > self.max_backlog:
+            seconds = len(samples) / TARGET_SAMPLE_RATE
+            stream_overflow_seconds.inc(seconds, action="rejected")
+            if self.session is not None:
+                self.session.rejected(seconds)
+            return seconds
+        self._store(samples)
+        return None
+
+    def _store(self, samples: np.ndarray, end_of_input: bool = False):
+        if self.denoiser is not None:
+            samples = self.denoiser.process(np.multiply(samples, self.decoder.scale, dtype=np.float32))
+            if end_of_input:
+                # Push out the denoiser's delayed tail, padded to a whole hop with silence
+                samples = np.concatenate((samples, self.denoiser.flush()))
+            written = self.ring.write(samples)
+        else:
+            written = self.ring.write(samples, self.decoder.scale)
+        if self.session is not None:
+            self.session.received(written / TARGET_SAMPLE_RATE)
+
+    async def process(self) -> List[Dict[str, Any]]:
+        """Look at the audio received since the last call and return the messages it produced."""
+        excess = self.backlog - self.max_backlog
+        if excess > 0:
+            stream_overflow_seconds.inc(excess / TARGET_SAMPLE_RATE, action="dropped")
+            segment = self.vad.skip(self.vad.position + excess)
+            if segment is not None:
+                self._segments.append(segment)
+        position = self.vad.position
+        self._segments.extend(self.vad.process())
+        if self.session is not None:
+            self.session.report_lag(self.backlog / TARGET_SAMPLE_RATE)
+
+        messages = []
+        if self.lang is None and not self._segments and self.vad.current_length >= self._detect_length:
+            messages.append(await self._detect_language(self.vad.current_audio()))
+        while self._segments:
+            messages.extend(await self._final(self._segments.pop(0)))
+            self._samples_since_partial = 0
+
+        if not self.vad.in_speech:
+            return messages
+        self._samples_since_partial += self.vad.position - position
+        audio = self.vad.current_audio()
+        if len(audio) > self._window:
+            message = await self._commit_window()
+            if message:
+                messages.append(message)
+            self._samples_since_partial = 0
+        elif self._samples_since_partial >= self._partial_interval and self.partials_enabled and self.lang:
+            self._samples_since_partial = 0
+            start = self.vad.current_start
+            result = await self._decode(audio, kind="partial", without_timestamps=True)
+            text = result["text"].strip() if result else ""
+            if text:
+                messages.append(transcript_message("partial", text, start, start + len(audio) / TARGET_SAMPLE_RATE))
+        return messages
+
+    async def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """Store one binary frame and process it straight away."""
+        self.write(data)
+        return await self.process()
+
+    @property
+    def partials_enabled(self) -> bool:
+        return self.session is None or self.session.partials_enabled
+
+    async def flush(self) -> List[Dict[str, Any]]:
+        """Process everything received so far and close the utterance in progress."""
+        self._store(self.decoder.flush(), end_of_input=True)
+        messages = await self.process()
+        segment = self.vad.flush()
+        if segment is None:
+            return messages
+        return messages + await self._final(segment)
+
+class StreamFlowControl:
+    """Pause and resume signalling for one connection, driven by its backlog."""
+
+    def __init__(self):
+        self.paused = False
+
+    def update(self, backlog_seconds: float) -> Optional[Dict[str, Any]]:
+        """The message to send the client now, if the flow state changed."""
+        if not self.paused and backlog_seconds >= STT_STREAM_PAUSE_BACKLOG_SECONDS:
+            self.paused = True
+            message = {"type": "pause", "backlog": round(backlog_seconds, 3)}
+        elif self.paused and backlog_seconds <= STT_STREAM_RESUME_BACKLOG_SECONDS:
+            self.paused = False
+            message = {"type": "resume", "credit": round(STT_STREAM_MAX_BACKLOG_SECONDS - backlog_seconds, 3)}
+        else:
+            return None
+        stream_flow_messages.inc(type=message["type"])
+        return message
+
+    @staticmethod
+    def overflow(seconds: float, session: StreamSession) -> Dict[str, Any]:
+        """The message telling the client a frame was refused and has to be sent again."""
+        stream_flow_messages.inc(type="overflow")
+        return {
+            "type": "overflow",
+            "dropped_seconds": round(seconds, 3),
+            "rejected_frames": session.rejected_frames,
+            "rejected_seconds": round(session.rejected_seconds, 3),
+        }
+
+def parse_stream_control(text: str) -> Dict[str, Any]:
+    """Text frames are JSON control messages; a bare "flush" is still accepted."""
+    if text.strip().lower() == "flush":
+        return {"type": "flush"}
+    try:
+        message = json.loads(text)
+    except ValueError:
+        raise ValueError("Control messages must be JSON")
+    if not isinstance(message, dict):
+        raise ValueError("Control messages must be JSON objects")
+    return message
 
 async def transcribe_audio_stream(websocket: WebSocket):
     await websocket.accept()
-    buffer = bytearray()
     try:
+        session = stream_scheduler.open()
+    except StreamSaturated as e:
+        logger.info(f"Refusing stream: {e}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1013, reason="Try again later")
+        return
+    transcriber = StreamingTranscriber(session=session)
+    flow = StreamFlowControl()
+    wakeup = asyncio.Event()
+    flush_requested = False
+    audio_received = False
+
+    async def send_flow():
+        message = flow.update(transcriber.backlog / TARGET_SAMPLE_RATE)
+        if message is not None:
+            await websocket.send_json(message)
+
+    async def decode_loop():
+        # Runs beside the receive loop so frames keep landing in the ring while Whisper works
+        nonlocal flush_requested
+        try:
+            while True:
+                await wakeup.wait()
+                wakeup.clear()
+                if flush_requested:
+                    flush_requested = False
+                    results = await transcriber.flush()
+                else:
+                    results = await transcriber.process()
+                for result in results:
+                    await websocket.send_json(result)
+                await send_flow()
+        except Exception as e:
+            logger.error(f"WebSocket decode error: {e}")
+            await websocket.close(code=1011, reason=str(e)[:120])
+
+    worker = asyncio.create_task(decode_loop())
+    try:
+        if session.degraded:
+            await websocket.send_json({"type": "degraded", "detail": "Server busy, partial results disabled"})
         while True:
-            data = await websocket.receive_bytes()
-            buffer.extend(data)
-            # For demonstration, transcribe every 5 seconds of audio
-            if len(buffer) > 16000 * 2 * 5:  # 5 seconds of 16kHz 16-bit audio
-                audio_array = preprocess_audio(bytes(buffer))
-                model = get_whisper_model("en")  # For streaming, use English base model
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(executor, model.transcribe, audio_array)
-                transcription = result["text"].strip()
-                await websocket.send_text(transcription)
-                buffer.clear()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("text") is not None:
+                try:
+                    control = parse_stream_control(message["text"])
+                    if control.get("type") == "start":
+                        if audio_received:
+                            raise ValueError("The start message must come before any audio")
+                        decoder = StreamAudioDecoder.from_handshake(control)
+                        lang = control.get("lang") or "auto"
+                        if lang != "auto" and lang not in SUPPORTED_LANGUAGES:
+                            raise ValueError(f"Language '{lang}' not supported")
+                        transcriber = StreamingTranscriber(None if lang == "auto" else lang, decoder, session)
+                        await websocket.send_json({"type": "ready", **decoder.describe(), "lang": lang})
+                    elif control.get("type") == "flush":
+                        flush_requested = True
+                        wakeup.set()
+                    else:
+                        raise ValueError(f"Unknown message type '{control.get('type')}'")
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    await websocket.close(code=1003, reason=str(e)[:120])
+                    return
+                continue
+
+            audio_received = True
+            refused = transcriber.write(message.get("bytes", b""))
+            if refused is not None:
+                await websocket.send_json(flow.overflow(refused, session))
+            await send_flow()
+            wakeup.set()
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         await websocket.close(code=1011, reason=str(e))
+    finally:
+        worker.cancel()
+        stream_scheduler.close(session)
 
 @app.websocket("/ws/stt")
 async def websocket_stt_endpoint(websocket: WebSocket):
     await transcribe_audio_stream(websocket)
 
 # Improved audio preprocessing with noise reduction and normalization
+#
+# Noise is removed by spectral gating on a sqrt-Hann STFT with 50% overlap-add.
+# Each frequency bin keeps a running noise power estimate. Frames below the
+# gate update it quickly; frames above it (speech) only nudge it, so it settles
+# on the noise floor between words and still follows slow changes. Bins that
+# are not DENOISE_THRESHOLD_DB above it are attenuated by DENOISE_REDUCTION_DB.
+#
+# The denoiser is incremental: /ws/stt sessions keep one each and feed it audio
+# as it arrives, /stt runs a fresh one over the clip. Work is done in blocks of
+# preallocated frames, so cost is linear in the new audio and memory does not
+# depend on how much has been seen.
+
+DENOISE_FRAME_SIZE = int(os.getenv("DENOISE_FRAME_SIZE", "512"))
+DENOISE_THRESHOLD_DB = float(os.getenv("DENOISE_THRESHOLD_DB", "6"))
+DENOISE_REDUCTION_DB = float(os.getenv("DENOISE_REDUCTION_DB", "18"))
+
+class StreamingDenoiser:
+    """Incremental spectral gate with a per-instance running noise profile.
+
+    Output lags input by ``latency`` samples.
+    """
 
-def enhanced_preprocess_audio(audio_data: bytes) -> np.ndarray:
+    NOISE_ADAPT = 0.9  # Per-frame smoothing of the noise estimate on gated frames
+    NOISE_CREEP = 0.998  # ... and on frames that pass the gate
+    GAIN_SMOOTHING = 0.5
+    BLOCK_FRAMES = 64
+
+    def __init__(self, frame_size: int = DENOISE_FRAME_SIZE):
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.latency = frame_size - self.hop
+        # Periodic sqrt-Hann: analysis times synthesis window sums to one at 50% overlap
+        self.window = np.sqrt(np.hanning(frame_size + 1)[:-1]).astype(np.float32)
+        self.threshold = 10.0 ** (DENOISE_THRESHOLD_DB / 10.0)
+        self.floor = np.float32(10.0 ** (-DENOISE_REDUCTION_DB / 20.0))
+        bins = frame_size // 2 + 1
+        self.noise_power: Optional[np.ndarray] = None
+        self._gain = np.ones(bins, dtype=np.float32)
+        self._history = np.zeros(self.latency, dtype=np.float32)
+        self._overlap = np.zeros(self.latency, dtype=np.float32)
+        self._pending = np.zeros(self.hop, dtype=np.float32)
+        self._pending_length = 0
+        self._input = np.zeros(self.latency + self.BLOCK_FRAMES * self.hop, dtype=np.float32)
+        self._frames = np.zeros((self.BLOCK_FRAMES, frame_size), dtype=np.float32)
+        self._target = np.empty(bins, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Denoise new samples; returns every output sample that is now complete."""
+        if self._pending_length:
+            samples = np.concatenate((self._pending[:self._pending_length], samples))
+        hops = len(samples) // self.hop
+        self._pending_length = len(samples) - hops * self.hop
+        self._pending[:self._pending_length] = samples[hops * self.hop:]
+        output = np.empty(hops * self.hop, dtype=np.float32)
+        for first in range(0, hops, self.BLOCK_FRAMES):
+            count = min(self.BLOCK_FRAMES, hops - first)
+            block = samples[first * self.hop:(first + count) * self.hop]
+            output[first * self.hop:(first + count) * self.hop] = self._process_block(block, count)
+        return output
+
+    def _process_block(self, block: np.ndarray, count: int) -> np.ndarray:
+        hop, latency = self.hop, self.latency
+        stream = self._input[:latency + count * hop]
+        stream[:latency] = self._history
+        stream[latency:] = block
+        self._history[:] = stream[-latency:]
+        frames = self._frames[:count]
+        np.multiply(np.lib.stride_tricks.sliding_window_view(stream, self.frame_size)[::hop], self.window, out=frames)
+
+        spectra = np.fft.rfft(frames, axis=1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        if self.noise_power is None:
+            # Bootstrap from the quietest frames of the first block; gated frames correct it quickly
+            self.noise_power = np.percentile(power, 10, axis=0).astype(np.float32)
+        noise, gain, target = self.noise_power, self._gain, self._target
+        for index in range(count):
+            frame_power = power[index]
+            passes = frame_power > noise * self.threshold
+            np.copyto(target, np.where(passes, 1.0, self.floor))
+            noise += (1.0 - np.where(passes, self.NOISE_CREEP, self.NOISE_ADAPT)) * (frame_power - noise)
+            gain *= self.GAIN_SMOOTHING
+            gain += (1.0 - self.GAIN_SMOOTHING) * target
+            spectra[index] *= gain
+
+        frames[:] = np.fft.irfft(spectra, self.frame_size, axis=1)
+        frames *= self.window
+        # Overlap-add: each hop of output is the tail of one frame plus the head of the next
+        output = frames[:, :hop].copy()
+        output[0] += self._overlap
+        output[1:] += frames[:-1, hop:]
+        self._overlap[:] = frames[-1, hop:]
+        return output.reshape(-1)
+
+    def flush(self) -> np.ndarray:
+        """End of stream: returns the delayed tail, padding the last partial hop with silence."""
+        tail = self.latency + (-self._pending_length % self.hop)
+        return self.process(np.zeros(tail, dtype=np.float32))
+
+def denoise_audio(samples: np.ndarray) -> np.ndarray:
+    """Denoise a whole clip with a fresh StreamingDenoiser, keeping its length and alignment."""
+    denoiser = StreamingDenoiser()
+    denoised = np.concatenate((denoiser.process(samples), denoiser.flush()))
+    return denoised[denoiser.latency:denoiser.latency + len(samples)]
+
+def peak_normalize(samples: np.ndarray) -> np.ndarray:
+    peak = np.max(np.abs(samples)) if samples.size else 0.0
+    return (samples / peak).astype(np.float32, copy=False) if peak > 0 else samples
+
+def enhanced_preprocess_audio(samples: np.ndarray) -> np.ndarray:
+    """Denoise and normalize a canonical buffer produced by ``ingest_audio``."""
     try:
-        audio_segment = AudioSegment.from_file(io.BytesIO(audio_data))
-        if audio_segment.channels == 2:
-            audio_segment = audio_segment.set_channels(1)
-        audio_segment = audio_segment.set_frame_rate(16000)
-        samples = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-        samples /= np.max(np.abs(samples))  # Normalize to -1 to 1
-        # Noise reduction
-        reduced_noise = nr.reduce_noise(y=samples, sr=16000)
-        # Additional normalization
-        normalized = reduced_noise / np.max(np.abs(reduced_noise))
-        return normalized
+        if not samples.size or np.max(np.abs(samples)) == 0:
+            return samples
+        return peak_normalize(denoise_audio(peak_normalize(samples)))
     except Exception as e:
         logger.error(f"Enhanced audio preprocessing failed: {e}")
         raise HTTPException(status_code=400, detail=f"Enhanced audio preprocessing failed: {str(e)}")
@@ -385,20 +3112,254 @@ def enhanced_preprocess_audio(audio_data: bytes) -> np.ndarray:
 # Override the existing preprocess_audio function with enhanced version
 preprocess_audio = enhanced_preprocess_audio
 
+# Input quality policy
+#
+# /stt measures each upload before preprocessing: SNR from the spread between
+# its loud and quiet 30 ms frames, and clipping as the share of samples sitting
+# on flat runs at the buffer's peak, which also catches clipped audio that was
+# scaled down afterwards. Uploads above STT_DENOISE_BELOW_SNR_DB skip
+# denoising, which costs time and can hurt accuracy when there is no noise to
+# remove. Quiet (peak below STT_NORMALIZE_BELOW_PEAK) or over-range audio is
+# normalized. Near-silent or heavily clipped audio is rejected with 422. The
+# time a skipped denoise would have taken is estimated from the running cost
+# of the denoises that did run.
+
+STT_DENOISE_BELOW_SNR_DB = float(os.getenv("STT_DENOISE_BELOW_SNR_DB", "25"))
+STT_NORMALIZE_BELOW_PEAK = float(os.getenv("STT_NORMALIZE_BELOW_PEAK", "0.25"))
+STT_REJECT_BELOW_DBFS = float(os.getenv("STT_REJECT_BELOW_DBFS", "-70"))
+STT_REJECT_CLIPPING_RATIO = float(os.getenv("STT_REJECT_CLIPPING_RATIO", "0.2"))
+
+preprocess_decisions = Counter("stt_preprocess_decisions_total", "Preprocessing steps chosen for /stt uploads", ("action",))
+preprocess_seconds_saved = Counter("stt_preprocess_seconds_saved_total", "Estimated denoising time skipped on clean uploads")
+input_snr_histogram = Histogram(
+    "stt_input_snr_db", "Estimated SNR of /stt uploads", buckets=(0, 5, 10, 15, 20, 25, 30, 40, 60)
+)
+
+class AudioQuality:
+    """Level, SNR and clipping estimate of a canonical buffer, in a few vectorized passes."""
+
+    def __init__(self, samples: np.ndarray):
+        self.duration = len(samples) / TARGET_SAMPLE_RATE
+        magnitude = np.abs(samples)
+        self.peak = float(magnitude.max()) if samples.size else 0.0
+        self.level_dbfs = float(10.0 * np.log10(np.mean(np.square(samples)) + 1e-10)) if samples.size else -100.0
+        frame_length = TARGET_SAMPLE_RATE * STT_VAD_FRAME_MS // 1000
+        usable = len(samples) - len(samples) % frame_length
+        if usable:
+            frames = samples[:usable].reshape(-1, frame_length)
+            energies = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+            quiet, loud = np.percentile(energies, (10, 90))
+            self.snr_db = float(loud - quiet)
+        else:
+            self.snr_db = 0.0
+        if self.peak > 0:
+            at_peak = magnitude >= 0.999 * self.peak
+            self.clipping_ratio = float(np.count_nonzero(at_peak[1:] & at_peak[:-1]) / len(samples))
+        else:
+            self.clipping_ratio = 0.0
+
+class PreprocessingDecision:
+    """What /stt does with an upload of a given quality."""
+
+    def __init__(self, quality: AudioQuality):
+        self.quality = quality
+        self.reject_reason: Optional[str] = None
+        if quality.level_dbfs < STT_REJECT_BELOW_DBFS:
+            self.reject_reason = f"Audio is silent ({quality.level_dbfs:.0f} dBFS)"
+        elif quality.clipping_ratio > STT_REJECT_CLIPPING_RATIO:
+            self.reject_reason = f"Audio is clipped ({quality.clipping_ratio:.0%} of samples)"
+        self.denoise = quality.snr_db < STT_DENOISE_BELOW_SNR_DB
+        self.normalize = self.denoise or not STT_NORMALIZE_BELOW_PEAK <= quality.peak <= 1.0
+        self.seconds_saved = 0.0 if self.denoise else denoise_cost.estimate(quality.duration)
+
+    @property
+    def actions(self) -> List[str]:
+        if self.reject_reason:
+            return ["reject"]
+        return [action for action, chosen in (("denoise", self.denoise), ("normalize", self.normalize)) if chosen] or ["none"]
+
+    def record(self):
+        input_snr_histogram.observe(self.quality.snr_db)
+        for action in self.actions:
+            preprocess_decisions.inc(action=action)
+        if self.seconds_saved:
+            preprocess_seconds_saved.inc(self.seconds_saved)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "actions": self.actions,
+            "snr_db": round(self.quality.snr_db, 1),
+            "level_dbfs": round(self.quality.level_dbfs, 1),
+            "clipping_ratio": round(self.quality.clipping_ratio, 4),
+            "seconds_saved": round(self.seconds_saved, 4),
+        }
+
+class DenoiseCost:
+    """Running average of /stt denoising time per second of audio."""
+
+    def __init__(self, seconds_per_audio_second: float):
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, audio_seconds: float):
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            self.seconds_per_audio_second += 0.1 * (seconds / audio_seconds - self.seconds_per_audio_second)
+
+    def estimate(self, audio_seconds: float) -> float:
+        return self.seconds_per_audio_second * audio_seconds
+
+denoise_cost = DenoiseCost(0.005)
+
 # Audio format validation and conversion utility
+#
+# Every upload is decoded exactly once into the canonical format below and that
+# buffer is handed to language detection, preprocessing and transcription.
+# Containers libsndfile understands (WAV, FLAC, OGG) are decoded in-process;
+# everything else costs a single ffmpeg spawn that also downmixes and resamples.
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+def resample_audio(samples: np.ndarray, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample a mono float32 buffer with a polyphase filter."""
+    if orig_sr == target_sr:
+        return samples
+    divisor = math.gcd(orig_sr, target_sr)
+    signal = lazy_import("scipy.signal")
+    with time_stage("resample"):
+        resampled = signal.resample_poly(samples, target_sr // divisor, orig_sr // divisor)
+    return resampled.astype(np.float32, copy=False)
+
+class StreamingResampler:
+    """Chunk-by-chunk polyphase resampler with the same filter as ``resample_poly``.
+
+    Input history and output phase carry over between chunks, so resampling a
+    stream in pieces gives the same samples as resampling it whole; ``flush``
+    zero-pads the end of the input exactly as ``resample_poly`` does.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE):
+        divisor = math.gcd(orig_sr, target_sr)
+        self.up, self.down = target_sr // divisor, orig_sr // divisor
+        max_rate = max(self.up, self.down)
+        self.delay = 10 * max_rate
+        signal = lazy_import("scipy.signal")
+        taps = signal.firwin(2 * self.delay + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        # Polyphase bank: phase p convolves input samples with taps p, p + up, p + 2 * up, ...
+        self.width = -(-len(taps) // self.up)
+        bank = np.zeros(self.up * self.width)
+        bank[:len(taps)] = taps
+        self._bank = bank.reshape(self.width, self.up).T.astype(np.float32)
+        self._reset()
+
+    def _reset(self):
+        # Absolute input index 0 sits at self._history[self.width]; earlier samples are the zero padding
+        self._history = np.zeros(self.width, dtype=np.float32)
+        self._history_start = -self.width
+        self._received = 0
+        self._emitted = 0
+
+    def _outputs(self, end: int) -> np.ndarray:
+        n = np.arange(self._emitted, end)
+        position = n * self.down + self.delay
+        newest = position // self.up - self._history_start
+        window = self._history[newest[:, None] - np.arange(self.width)]
+        output = np.einsum("ij,ij->i", self._bank[position % self.up], window)
+        self._emitted = end
+        # Keep only the input the next output still reaches back to
+        oldest = (end * self.down + self.delay) // self.up - self.width + 1
+        drop = max(0, oldest - self._history_start)
+        self._history = self._history[drop:]
+        self._history_start += drop
+        return output
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample new input; returns every output sample it completes."""
+        self._history = np.concatenate((self._history, samples.astype(np.float32, copy=False)))
+        self._received += len(samples)
+        end = max(self._emitted, (self._received * self.up - 1 - self.delay) // self.down + 1)
+        return self._outputs(end)
+
+    def flush(self) -> np.ndarray:
+        """End of input: the remaining output, with silence after the last sample. Starts a new stream."""
+        end = -(-self._received * self.up // self.down)
+        if end > self._emitted:
+            needed = ((end - 1) * self.down + self.delay) // self.up + 1
+            padding = needed - (self._history_start + len(self._history))
+            self._history = np.concatenate((self._history, np.zeros(max(padding, 0), dtype=np.float32)))
+            output = self._outputs(end)
+        else:
+            output = np.zeros(0, dtype=np.float32)
+        self._reset()
+        return output
 
-def validate_and_convert_audio(file: UploadFile) -> bytes:
+def _decode_with_soundfile(contents: bytes) -> Optional[np.ndarray]:
+    """Decode in-process with libsndfile; returns None for unsupported containers."""
+    try:
+        with time_stage("decode", backend="soundfile"):
+            data, sample_rate = sf.read(io.BytesIO(contents), dtype="float32", always_2d=True)
+            samples = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+            samples = np.ascontiguousarray(samples, dtype=np.float32)
+    except RuntimeError:
+        return None
+    return resample_audio(samples, sample_rate)
+
+def _decode_with_ffmpeg(contents: bytes) -> np.ndarray:
+    """Decode, downmix and resample with one ffmpeg process, streaming through pipes."""
+    command = [
+        FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le", "-acodec", "pcm_f32le",
+        "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE),
+        "pipe:1",
+    ]
+    with time_stage("decode", backend="ffmpeg"):
+        process = subprocess.run(command, input=contents, capture_output=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {sanitize_for_log(process.stderr.decode(errors='replace'))}")
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+def ingest_audio(contents: bytes) -> np.ndarray:
+    """Decode an upload into the canonical 16 kHz mono float32 buffer."""
+    if not contents:
+        raise ValueError("Empty audio payload")
+    samples = _decode_with_soundfile(contents)
+    if samples is None:
+        samples = _decode_with_ffmpeg(contents)
+    if samples.size == 0:
+        raise ValueError("Audio contains no samples")
+    return samples
+
+def validate_and_convert_audio(file: UploadFile) -> np.ndarray:
     try:
         contents = file.file.read()
-        audio_segment = AudioSegment.from_file(io.BytesIO(contents))
-        # Convert to WAV 16kHz mono if not already
-        if audio_segment.channels != 1 or audio_segment.frame_rate != 16000:
-            audio_segment = audio_segment.set_channels(1).set_frame_rate(16000)
-        buffer = io.BytesIO()
-        audio_segment.export(buffer, format="wav")
-        return buffer.getvalue()
+        return ingest_audio(contents)
     except Exception as e:
         logger.error(f"Audio validation/conversion failed: {e}")
         raise HTTPException(status_code=400, detail=f"Audio validation/conversion failed: {str(e)}")
 
+# Startup import report
+
+MODULE_IMPORT_SECONDS = time.perf_counter() - _MODULE_IMPORT_STARTED
+
+def import_report() -> Dict[str, Any]:
+    """Where import time went: this module's eager imports plus each lazy import so far."""
+    return {
+        "module_import_seconds": MODULE_IMPORT_SECONDS,
+        "lazy_imports": dict(sorted(IMPORT_TIMINGS.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+@app.on_event("startup")
+def log_import_report():
+    report = import_report()
+    deferred = [name for name in ("torch", "whisper", "TTS.api", "scipy.signal") if name not in sys.modules]
+    logger.info(
+        f"app module imported in {report['module_import_seconds']:.2f}s; "
+        f"deferred until first use: {', '.join(deferred) or 'none'} "
+        f"(run with python -X importtime for a per-module breakdown)"
+    )
 
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for STT/TTS backend services
+Runs in-process against app.py, no server needed
+Needs requirements.txt plus requirements-bench.txt (httpx, for the test client)
+"""
+
+import argparse
+import io
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Short prompts like the ones the AR/VR voice assistant sends
+PHRASES = [
+    "Hello.",
+    "Turn left at the next door.",
+    "The meeting room is on the second floor.",
+    "Welcome to the virtual walkthrough of the temple.",
+]
+
+# Synthetic corpus grid
+DURATIONS = [1, 5, 15, 30, 60, 120]
+SAMPLE_RATES = [8000, 16000, 44100]
+CHANNELS = [1, 2]
+FORMATS = ["wav", "mp3", "ogg"]
+STAGES = ["decode", "resample", "analyze", "denoise", "detect", "transcribe", "stt_request", "tts_request"]
+# Stages that run a model only see one encoding per duration, the container
+# and sample rate do not change their cost once the audio is decoded
+MODEL_STAGES = {"detect", "transcribe", "stt_request"}
+SOUNDFILE_FORMATS = {"wav": ("WAV", "PCM_16"), "mp3": ("MP3", None), "ogg": ("OGG", "VORBIS")}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(latencies, audio_seconds=None):
+    """Latency summary in milliseconds, plus real-time factor when audio durations are given"""
+    summary = {
+        "count": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    if audio_seconds:
+        rtf = [latency / seconds for latency, seconds in zip(latencies, audio_seconds)]
+        summary.update({
+            "audio_seconds": sum(audio_seconds),
+            "rtf_mean": sum(latencies) / sum(audio_seconds),
+            "rtf_p50": percentile(rtf, 50),
+            "rtf_p95": percentile(rtf, 95),
+            "rtf_p99": percentile(rtf, 99),
+        })
+    return summary
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of finished children (ffmpeg, workers)"""
+    per_mb = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / per_mb,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / per_mb,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Deterministic synthetic audio
+
+def synthetic_speech(duration, sample_rate, channels, seed):
+    """Speech-like test signal: voiced harmonics in syllable-length bursts with pauses over a noise floor"""
+    rng = np.random.default_rng(seed)
+    count = int(duration * sample_rate)
+    t = np.arange(count) / sample_rate
+    pitch = 110 + 40 * rng.random() + 15 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8) if k * pitch.max() < sample_rate / 2)
+    # 4 Hz syllables, grouped into words separated by short pauses
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    words = (np.sin(2 * np.pi * 0.3 * t + rng.random() * np.pi) > -0.6).astype(np.float32)
+    mono = 0.3 * voiced * syllables * words + 0.003 * rng.standard_normal(count)
+    signal = np.stack([mono * (0.8 + 0.2 * channel) for channel in range(channels)], axis=1)
+    return signal.astype(np.float32)
+
+def encode(signal, sample_rate, fmt):
+    import soundfile as sf
+
+    container, subtype = SOUNDFILE_FORMATS[fmt]
+    buffer = io.BytesIO()
+    sf.write(buffer, signal, sample_rate, format=container, subtype=subtype)
+    return buffer.getvalue()
+
+def build_corpus(durations, sample_rates, channels, formats):
+    """Every combination of the grid, encoded once; the same parameters always give the same bytes"""
+    import soundfile as sf
+
+    corpus = []
+    for duration in durations:
+        for rate in sample_rates:
+            for channel_count in channels:
+                signal = None
+                for fmt in formats:
+                    if SOUNDFILE_FORMATS[fmt][0] not in sf.available_formats():
+                        print(f"⚠ libsndfile cannot write {fmt}, skipping")
+                        continue
+                    if signal is None:
+                        seed = zlib.crc32(f"{duration}-{rate}-{channel_count}".encode())
+                        signal = synthetic_speech(duration, rate, channel_count, seed)
+                    corpus.append({
+                        "name": f"{duration}s_{rate}hz_{channel_count}ch.{fmt}",
+                        "duration": duration,
+                        "sample_rate": rate,
+                        "channels": channel_count,
+                        "format": fmt,
+                        "contents": encode(signal, rate, fmt),
+                    })
+    return corpus
+
+def model_subset(corpus):
+    """One clip per duration for the model stages, the one closest to what clients send"""
+    chosen = {}
+    for item in corpus:
+        key = (item["sample_rate"] != 16000, item["channels"] != 1, item["format"] != "wav")
+        best = chosen.get(item["duration"])
+        if best is None or key < best[0]:
+            chosen[item["duration"]] = (key, item)
+    return [item for _, item in sorted(chosen.values(), key=lambda entry: entry[1]["duration"])]
+
+# Stage benchmarks
+
+def bench_audio_stages(backend, corpus, stages, iterations):
+    """Time decode, resample, analyze and denoise on every corpus item"""
+    import soundfile as sf
+
+    print("\n🎧 Benchmarking audio stages...")
+    timings = {stage: ([], []) for stage in ("decode", "resample", "analyze", "denoise") if stage in stages}
+    for item in corpus:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            try:
+                data, rate = sf.read(io.BytesIO(item["contents"]), dtype="float32", always_2d=True)
+                mono = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+                mono = np.ascontiguousarray(mono, dtype=np.float32)
+                native = True
+            except RuntimeError:
+                # Containers libsndfile cannot read go through ffmpeg, which also resamples
+                mono, rate, native = backend._decode_with_ffmpeg(item["contents"]), backend.TARGET_SAMPLE_RATE, False
+            decoded = time.perf_counter()
+            samples = backend.resample_audio(mono, rate)
+            resampled = time.perf_counter()
+
+            if "decode" in timings:
+                timings["decode"][0].append(decoded - started)
+                timings["decode"][1].append(item["duration"])
+            if "resample" in timings and native and rate != backend.TARGET_SAMPLE_RATE:
+                timings["resample"][0].append(resampled - decoded)
+                timings["resample"][1].append(item["duration"])
+            if "analyze" in timings:
+                timings["analyze"][0].append(timed(backend.AudioQuality, samples))
+                timings["analyze"][1].append(item["duration"])
+            if "denoise" in timings:
+                timings["denoise"][0].append(timed(backend.denoise_audio, samples))
+                timings["denoise"][1].append(item["duration"])
+
+    report = {stage: summarize(*values) for stage, values in timings.items() if values[0]}
+    for stage, summary in report.items():
+        print(f"  - {stage}: p50 {summary['p50_ms']:.1f} ms, RTF {summary['rtf_mean']:.4f}")
+    return report
+
+def bench_model_stages(backend, corpus, stages, iterations):
+    """Time language detection, Whisper transcription and the full /stt request"""
+    if not MODEL_STAGES & set(stages):
+        return {}
+    print("\n🗣  Benchmarking model stages...")
+    if not backend.WHISPER_AVAILABLE:
+        print("⚠ Whisper not available, skipping")
+        return {}
+    from fastapi.testclient import TestClient
+
+    client = TestClient(backend.app)
+    model = backend.get_whisper_model("en")
+    timings = {stage: ([], []) for stage in MODEL_STAGES if stage in stages}
+    for item in model_subset(corpus):
+        samples = backend.ingest_audio(item["contents"])
+        for _ in range(iterations):
+            if "detect" in timings:
+                timings["detect"][0].append(timed(backend.detect_language_from_array, samples))
+                timings["detect"][1].append(item["duration"])
+            if "transcribe" in timings:
+                started = time.perf_counter()
+                model.transcribe(samples, language="en", fp16=False)
+                timings["transcribe"][0].append(time.perf_counter() - started)
+                timings["transcribe"][1].append(item["duration"])
+            if "stt_request" in timings:
+                started = time.perf_counter()
+                response = client.post("/stt", files={"file": (item["name"], item["contents"])}, data={"lang": "en"})
+                elapsed = time.perf_counter() - started
+                if response.status_code == 200:
+                    timings["stt_request"][0].append(elapsed)
+                    timings["stt_request"][1].append(item["duration"])
+                else:
+                    print(f"  ✗ /stt {item['name']}: status {response.status_code}")
+
+    report = {stage: summarize(*values) for stage, values in timings.items() if values[0]}
+    for stage, summary in report.items():
+        print(f"  - {stage}: p50 {summary['p50_ms']:.1f} ms, RTF {summary['rtf_mean']:.4f}")
+    return report
+
+def bench_tts(backend, iterations):
+    """Time /tts for every available backend; each request has new text so the cache never answers"""
+    print("\n🔊 Benchmarking TTS backends...")
+    from fastapi.testclient import TestClient
+
+    client = TestClient(backend.app)
+    report = {}
+    for name, tts_backend in backend.TTS_BACKENDS.items():
+        if not tts_backend.available():
+            print(f"⚠ {name} not available, skipping")
+            continue
+        latencies = []
+        for index in range(iterations):
+            text = f"{PHRASES[index % len(PHRASES)]} Benchmark run {time.time_ns()}."
+            started = time.perf_counter()
+            response = client.post("/tts", data={"text": text, "lang": "en", "backend": name})
+            if response.status_code != 200:
+                print(f"  ✗ {name}: status {response.status_code}")
+                break
+            latencies.append(time.perf_counter() - started)
+        if latencies:
+            report[name] = summarize(latencies)
+            print(f"  - {name}: p50 {report[name]['p50_ms']:.1f} ms")
+    return report
+
+def bench_pyttsx3_pool(iterations, pool_size, concurrency):
+    """Compare pyttsx3.init() per request against the engine pool"""
+    print("\n🔊 Benchmarking pyttsx3 pooled vs unpooled...")
+    import app as backend
+
+    if not backend.PYTTSX3_AVAILABLE:
+        print("⚠ pyttsx3 not available, skipping")
+        return None
+
+    phrases = [PHRASES[i % len(PHRASES)] for i in range(iterations)]
+    unpooled = [timed(backend.synthesize_pyttsx3_unpooled, phrase) for phrase in phrases]
+
+    pool = backend.Pyttsx3EnginePool(pool_size, backend.PYTTSX3_MAX_USES, max_pending=iterations)
+    pool.synthesize(PHRASES[0])  # Start the engines outside the measurement
+    pooled = [timed(pool.synthesize, phrase) for phrase in phrases]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        concurrent_latencies = list(clients.map(lambda phrase: timed(pool.synthesize, phrase), phrases))
+    concurrent_elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    report = {
+        "iterations": iterations,
+        "pool_size": pool.size,
+        "driver": pool.driver,
+        "unpooled": summarize(unpooled),
+        "pooled": summarize(pooled),
+        "pooled_concurrent": {
+            **summarize(concurrent_latencies),
+            "concurrency": concurrency,
+            "throughput_per_s": iterations / concurrent_elapsed,
+        },
+    }
+    report["p50_speedup"] = report["unpooled"]["p50_ms"] / report["pooled"]["p50_ms"]
+    print(f"  - unpooled p50: {report['unpooled']['p50_ms']:.1f} ms")
+    print(f"  - pooled p50:   {report['pooled']['p50_ms']:.1f} ms ({report['p50_speedup']:.1f}x)")
+    print(f"  - pooled x{concurrency} throughput: {report['pooled_concurrent']['throughput_per_s']:.1f} req/s")
+    return report
+
+def csv_list(kind):
+    return lambda value: [kind(part) for part in value.split(",") if part]
+
+def main():
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=3, help="Repetitions per corpus item and stage")
+    parser.add_argument("--durations", type=csv_list(float), default=DURATIONS)
+    parser.add_argument("--sample-rates", type=csv_list(int), default=SAMPLE_RATES)
+    parser.add_argument("--channels", type=csv_list(int), default=CHANNELS)
+    parser.add_argument("--formats", type=csv_list(str), default=FORMATS)
+    parser.add_argument("--stages", type=csv_list(str), default=STAGES)
+    parser.add_argument("--pyttsx3-pool", action="store_true", help="Also compare pooled and unpooled pyttsx3")
+    parser.add_argument("--pool-iterations", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    print("🚀 Starting STT/TTS Backend Benchmarks")
+    print("=" * 50)
+
+    started = time.perf_counter()
+    import app as backend
+    import_seconds = time.perf_counter() - started
+
+    corpus = build_corpus(args.durations, args.sample_rates, args.channels, args.formats)
+    print(f"✓ Built a corpus of {len(corpus)} clips ({sum(item['duration'] for item in corpus):.0f} s of audio)")
+
+    stages = {}
+    stages.update(bench_audio_stages(backend, corpus, args.stages, args.iterations))
+    stages.update(bench_model_stages(backend, corpus, args.stages, args.iterations))
+
+    results = {
+        "commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "cpu_count": backend.os.cpu_count(),
+        },
+        "app_import_seconds": import_seconds,
+        "corpus": [{key: value for key, value in item.items() if key != "contents"} for item in corpus],
+        "iterations": args.iterations,
+        "stages": stages,
+    }
+    if "tts_request" in args.stages:
+        results["tts"] = bench_tts(backend, args.iterations)
+    if args.pyttsx3_pool:
+        results["pyttsx3_pool"] = bench_pyttsx3_pool(args.pool_iterations, args.pool_size, args.concurrency)
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"\n📈 Peak RSS: {results['peak_rss_mb']['self']:.0f} MB (children {results['peak_rss_mb']['children']:.0f} MB)")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\n✓ Wrote report to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Load generator for the STT/TTS backend
+Ramps concurrency against a running server with a weighted mix of /stt, /tts
+and real-time /ws/stt streams, and writes a saturation curve to JSON
+
+    python loadgen.py --url http://localhost:8000 --concurrency 1,2,4,8,16 --output run.json
+    python loadgen.py --compare baseline.json run.json
+
+Needs the packages in requirements-bench.txt (pip install -r requirements-bench.txt)
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from benchmark import PHRASES, synthetic_speech
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02  # 20 ms of audio per WebSocket message, like a browser AudioWorklet
+REQUEST_KINDS = ["stt", "tts", "ws_stt"]
+PERCENTILES = [50, 90, 95, 99, 99.9]
+
+class LatencyHistogram:
+    """HDR-style histogram: log-spaced buckets with a fixed relative error, cheap to record and merge"""
+
+    PRECISION = 0.01  # Bucket width as a fraction of its value
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._log_base = math.log1p(self.PRECISION)
+
+    def record(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        index = int(math.log(micros) / self._log_base)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct):
+        """Value at the percentile, in seconds, to within PRECISION"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Middle of the bucket, clamped to what was actually recorded
+                value = math.exp((index + 0.5) * self._log_base) / 1e6
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min_ms": self.min * 1000,
+            "mean_ms": self.total / self.count * 1000,
+            "max_ms": self.max * 1000,
+            **{f"p{pct:g}_ms": self.percentile(pct) * 1000 for pct in PERCENTILES},
+            "buckets": {str(index): count for index, count in sorted(self.buckets.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data.get("buckets", {}).items()}
+        histogram.count = data.get("count", 0)
+        if histogram.count:
+            histogram.total = data["mean_ms"] * histogram.count / 1000
+            histogram.min = data["min_ms"] / 1000
+            histogram.max = data["max_ms"] / 1000
+        return histogram
+
+class StepStats:
+    """Results of one concurrency step, per request kind"""
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        # For /ws/stt the latency is per final transcript: from sending the
+        # last audio it covers to receiving it
+        self.latency = {kind: LatencyHistogram() for kind in REQUEST_KINDS}
+        self.completed = {kind: 0 for kind in REQUEST_KINDS}
+        self.errors = {kind: {} for kind in REQUEST_KINDS}
+        # Streaming only: how far partial transcripts trail the audio they cover
+        self.stream_lag = LatencyHistogram()
+        self.stream_audio_seconds = 0.0
+        self.stream_pauses = 0
+        self.stream_overflows = 0
+        self.degraded_streams = 0
+        self.elapsed = 0.0
+
+    def error(self, kind, reason):
+        self.errors[kind][reason] = self.errors[kind].get(reason, 0) + 1
+
+    def to_dict(self):
+        requests = {}
+        for kind in REQUEST_KINDS:
+            errors = sum(self.errors[kind].values())
+            attempts = self.completed[kind] + errors
+            if not attempts:
+                continue
+            requests[kind] = {
+                "attempts": attempts,
+                "errors": self.errors[kind],
+                "error_rate": errors / attempts,
+                "throughput_per_s": self.completed[kind] / self.elapsed,
+                "latency": self.latency[kind].to_dict(),
+            }
+        overall = LatencyHistogram()
+        for histogram in self.latency.values():
+            overall.merge(histogram)
+        attempts = sum(entry["attempts"] for entry in requests.values())
+        failures = sum(sum(self.errors[kind].values()) for kind in REQUEST_KINDS)
+        report = {
+            "concurrency": self.concurrency,
+            "elapsed_s": self.elapsed,
+            "throughput_per_s": sum(self.completed.values()) / self.elapsed,
+            "error_rate": failures / attempts if attempts else 0.0,
+            "latency": overall.to_dict(),
+            "requests": requests,
+        }
+        if "ws_stt" in requests:
+            report["streams"] = {
+                "audio_seconds": self.stream_audio_seconds,
+                "realtime_streams": self.stream_audio_seconds / self.elapsed,
+                "pauses": self.stream_pauses,
+                "overflows": self.stream_overflows,
+                "degraded": self.degraded_streams,
+                "lag": self.stream_lag.to_dict(),
+            }
+        return report
+
+# Request workloads
+
+def load_clip(path, seconds):
+    """16 kHz mono float32 audio: the given file, or synthetic speech cut after its last voiced sample"""
+    if path:
+        import soundfile as sf
+
+        audio, rate = sf.read(path, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        return audio
+    audio = synthetic_speech(seconds, SAMPLE_RATE, 1, seed=seconds)[:, 0]
+    loud = np.flatnonzero(np.abs(audio) > 0.05)
+    return audio[:loud[-1] + 1] if len(loud) else audio
+
+def wav_bytes(audio):
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+class Workload:
+    """Issues single requests of each kind against one server"""
+
+    def __init__(self, args, http):
+        self.args = args
+        self.http = http
+        self.clip = load_clip(args.audio, args.clip_seconds)
+        self.wav = wav_bytes(self.clip)
+        self.pcm = (np.clip(self.clip, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        self.frame_bytes = int(SAMPLE_RATE * FRAME_SECONDS) * 2
+        self.ws_url = args.url.replace("http", "ws", 1).rstrip("/") + "/ws/stt"
+        self._tts_counter = 0
+
+    async def run(self, kind, stats):
+        started = time.perf_counter()
+        try:
+            reason = await getattr(self, kind)(stats)
+        except Exception as e:
+            reason = type(e).__name__
+        if reason is not None:
+            stats.error(kind, reason)
+            return
+        stats.completed[kind] += 1
+        if kind != "ws_stt":
+            stats.latency[kind].record(time.perf_counter() - started)
+
+    async def stt(self, stats):
+        response = await self.http.post(
+            "/stt", files={"file": ("load.wav", self.wav, "audio/wav")},
+            data={"lang": self.args.lang, "use_auto_detection": "false"}
+        )
+        return None if response.status_code == 200 else f"http_{response.status_code}"
+
+    async def tts(self, stats):
+        # New text every time, otherwise the TTS cache answers after the first request
+        self._tts_counter += 1
+        text = f"{PHRASES[self._tts_counter % len(PHRASES)]} Request {self._tts_counter}."
+        response = await self.http.post("/tts", data={"text": text, "lang": self.args.lang})
+        if response.status_code != 200:
+            return f"http_{response.status_code}"
+        await response.aread()
+        return None
+
+    async def ws_stt(self, stats):
+        """One stream at real-time pacing, honouring pause/resume, ended by a flush"""
+        import websockets
+
+        loop = asyncio.get_running_loop()
+        frames = range(0, len(self.pcm), self.frame_bytes)
+        sent_at = []
+        resumed = asyncio.Event()
+        resumed.set()
+        state = {"ready": False, "error": None, "finals": 0, "last_message": loop.time()}
+
+        async def reader(socket):
+            async for raw in socket:
+                message = json.loads(raw)
+                kind = message.get("type")
+                now = state["last_message"] = loop.time()
+                if kind == "ready":
+                    state["ready"] = True
+                elif kind == "degraded":
+                    stats.degraded_streams += 1
+                elif kind == "pause":
+                    stats.stream_pauses += 1
+                    resumed.clear()
+                elif kind == "resume":
+                    resumed.set()
+                elif kind == "overflow":
+                    # Refused frames are counted, not resent
+                    stats.stream_overflows += 1
+                elif kind == "error":
+                    state["error"] = "server_error"
+                    resumed.set()
+                elif kind in ("partial", "final"):
+                    frame = min(max(0, math.ceil(message.get("end", 0) / FRAME_SECONDS) - 1), len(sent_at) - 1)
+                    if frame < 0:
+                        continue
+                    if kind == "final":
+                        state["finals"] += 1
+                        stats.latency["ws_stt"].record(max(0.0, now - sent_at[frame]))
+                    else:
+                        stats.stream_lag.record(max(0.0, now - sent_at[frame]))
+
+        try:
+            async with websockets.connect(self.ws_url, open_timeout=self.args.timeout, max_queue=None) as socket:
+                reading = asyncio.create_task(reader(socket))
+                try:
+                    await socket.send(json.dumps({
+                        "type": "start", "encoding": "pcm_s16le", "sample_rate": SAMPLE_RATE,
+                        "channels": 1, "lang": self.args.lang,
+                    }))
+                    next_at = loop.time()
+                    for offset in frames:
+                        if not resumed.is_set():
+                            paused_at = loop.time()
+                            await resumed.wait()
+                            next_at += loop.time() - paused_at
+                        if state["error"]:
+                            return state["error"]
+                        await asyncio.sleep(max(0.0, next_at - loop.time()))
+                        await socket.send(self.pcm[offset:offset + self.frame_bytes])
+                        sent_at.append(loop.time())
+                        next_at += FRAME_SECONDS
+                    stats.stream_audio_seconds += len(self.clip) / SAMPLE_RATE
+                    await socket.send(json.dumps({"type": "flush"}))
+                    # The server does not acknowledge a flush; the stream is done once it goes quiet
+                    deadline = loop.time() + self.args.timeout
+                    state["last_message"] = loop.time()
+                    while loop.time() < deadline and not reading.done():
+                        if loop.time() - state["last_message"] >= self.args.settle_seconds:
+                            break
+                        await asyncio.sleep(0.01)
+                finally:
+                    reading.cancel()
+        except websockets.ConnectionClosed as e:
+            if e.rcvd and e.rcvd.code == 1013:
+                # The scheduler turned the stream away; back off like a client would
+                await asyncio.sleep(1.0)
+                return "saturated"
+            return f"closed_{e.rcvd.code if e.rcvd else 'abnormal'}"
+        if state["error"]:
+            return state["error"]
+        if not state["ready"]:
+            return "no_handshake"
+        if not state["finals"]:
+            return "no_final"
+        return None
+
+# Ramp and report
+
+async def run_step(workload, concurrency, step_seconds, mix, rng):
+    """Closed loop: each of `concurrency` users sends its next request as soon as the last one finishes"""
+    stats = StepStats(concurrency)
+    kinds, weights = zip(*mix.items())
+    started = time.perf_counter()
+    deadline = started + step_seconds
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await workload.run(rng.choices(kinds, weights)[0], stats)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    stats.elapsed = time.perf_counter() - started
+    return stats.to_dict()
+
+def saturated(step, slo_ms, max_error_rate):
+    p95 = step["latency"].get("p95_ms")
+    return step["error_rate"] > max_error_rate or (p95 is not None and p95 > slo_ms)
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_load(args, mix):
+    import httpx
+
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as http:
+        health = await http.get("/health")
+        health.raise_for_status()
+        workload = Workload(args, http)
+        print(f"✓ Server is up, clip is {len(workload.clip) / SAMPLE_RATE:.1f} s")
+
+        steps = []
+        for concurrency in args.concurrency:
+            step = await run_step(workload, concurrency, args.step_seconds, mix, rng)
+            steps.append(step)
+            over = saturated(step, args.slo_ms, args.max_error_rate)
+            p95 = step["latency"].get("p95_ms")
+            print(
+                f"  {'✗' if over else '✓'} x{concurrency}: {step['throughput_per_s']:.2f} req/s, "
+                f"p95 {p95 or 0:.0f} ms, errors {step['error_rate']:.1%}"
+            )
+            if over and args.stop_on_saturation:
+                break
+
+    within = [step for step in steps if not saturated(step, args.slo_ms, args.max_error_rate)]
+    return {
+        "commit": git_commit(),
+        "label": args.label,
+        "url": args.url,
+        "mix": mix,
+        "clip_seconds": len(workload.clip) / SAMPLE_RATE,
+        "step_seconds": args.step_seconds,
+        "slo": {"p95_ms": args.slo_ms, "max_error_rate": args.max_error_rate},
+        "steps": steps,
+        "saturation": {
+            "max_concurrency_within_slo": within[-1]["concurrency"] if within else None,
+            "peak_throughput_per_s": max(step["throughput_per_s"] for step in steps),
+        },
+    }
+
+def compare(baseline_path, candidate_path):
+    """Print how each step and request kind moved between two runs"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    print(f"📊 {baseline.get('label') or baseline.get('commit')} → {candidate.get('label') or candidate.get('commit')}")
+    if baseline["mix"] != candidate["mix"] or baseline["clip_seconds"] != candidate["clip_seconds"]:
+        print("⚠ The runs used different request mixes or clips, throughput is not comparable")
+
+    def change(old, new):
+        if old is None or new is None:
+            return "n/a"
+        return f"{old:.1f} → {new:.1f} ({(new - old) / old:+.1%})" if old else f"{old:.1f} → {new:.1f}"
+
+    old_steps = {step["concurrency"]: step for step in baseline["steps"]}
+    for step in candidate["steps"]:
+        old = old_steps.get(step["concurrency"])
+        if old is None:
+            continue
+        print(f"\nx{step['concurrency']}: throughput {change(old['throughput_per_s'], step['throughput_per_s'])} req/s, "
+              f"errors {old['error_rate']:.1%} → {step['error_rate']:.1%}")
+        for kind in REQUEST_KINDS:
+            if kind not in step["requests"] or kind not in old["requests"]:
+                continue
+            before = LatencyHistogram.from_dict(old["requests"][kind]["latency"])
+            after = LatencyHistogram.from_dict(step["requests"][kind]["latency"])
+            for pct in (50, 95, 99):
+                low, high = before.percentile(pct), after.percentile(pct)
+                print(f"  - {kind} p{pct}: {change(low and low * 1000, high and high * 1000)} ms")
+    print(
+        f"\nMax concurrency within SLO: {baseline['saturation']['max_concurrency_within_slo']}"
+        f" → {candidate['saturation']['max_concurrency_within_slo']}"
+    )
+
+def csv_list(kind):
+    return lambda value: [kind(part) for part in value.split(",") if part]
+
+def parse_mix(value):
+    """"stt=5,tts=3,ws_stt=2" -> weights per request kind"""
+    mix = {}
+    for entry in value.split(","):
+        kind, _, weight = entry.partition("=")
+        if kind.strip() not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind '{kind}'")
+        mix[kind.strip()] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs at least one positive weight")
+    return {kind: weight for kind, weight in mix.items() if weight > 0}
+
+def main():
+    """Run a ramp, or compare two earlier runs"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=csv_list(int), default=[1, 2, 4, 8, 16], help="Concurrent users per step")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("stt=4,tts=4,ws_stt=2"))
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--audio", help="Clip to send instead of synthetic speech")
+    parser.add_argument("--clip-seconds", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--settle-seconds", type=float, default=2, help="Quiet time after a flush that ends a stream")
+    parser.add_argument("--slo-ms", type=float, default=2000, help="p95 latency that counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--stop-on-saturation", action="store_true")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the request mix")
+    parser.add_argument("--label", help="Name for this run in comparisons")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="Compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    print("🚀 Starting STT/TTS load test")
+    print("=" * 50)
+    print(f"Mix: {', '.join(f'{kind}={weight:g}' for kind, weight in args.mix.items())}")
+    results = asyncio.run(run_load(args, args.mix))
+    print(f"\n📈 Max concurrency within SLO: {results['saturation']['max_concurrency_within_slo']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"✓ Wrote report to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -159,50 +159,184 @@ def test_language_detection():
         print(f"✗ Language detection error: {e}")
         return False
 
+def test_ffmpeg_spawns_per_request():
+    """Check in-process that each request spawns ffmpeg at most once"""
+    print("\n🎬 Testing ffmpeg spawns per request...")
+    try:
+        import io
+        import shutil
+        import subprocess
+        import sys
+        import numpy as np
+        import soundfile as sf
+        from fastapi.testclient import TestClient
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import app as backend
+    except ImportError as e:
+        print(f"⚠ In-process test dependencies missing ({e}), skipping")
+        return False
+
+    class FakeWhisperModel:
+        device = "cpu"
+
+        class dims:
+            n_mels = 80
+
+        def detect_language(self, mel):
+            return "hi", {"hi": 0.9, "en": 0.1}
+
+        def transcribe(self, audio, **kwargs):
+            return {"text": "ok"}
+
+    # 44.1 kHz stereo WAV is decoded in-process; MP3 needs exactly one ffmpeg run
+    t = np.linspace(0, 2, 44100 * 2, False)
+    stereo = np.stack([np.sin(440 * 2 * np.pi * t), np.sin(220 * 2 * np.pi * t)], axis=1) * 0.5
+    wav_buffer = io.BytesIO()
+    sf.write(wav_buffer, stereo, 44100, format="WAV")
+    uploads = [("test.wav", wav_buffer.getvalue(), 0)]
+    if shutil.which(backend.FFMPEG_BINARY):
+        mp3 = subprocess.run(
+            [backend.FFMPEG_BINARY, "-loglevel", "error", "-i", "pipe:0", "-f", "mp3", "pipe:1"],
+            input=wav_buffer.getvalue(), capture_output=True, check=True
+        ).stdout
+        uploads.append(("test.mp3", mp3, 1))
+    else:
+        print("  - ffmpeg not found, only checking the in-process WAV path")
+
+    spawns = []
+    real_popen = subprocess.Popen
+
+    class CountingPopen(real_popen):
+        def __init__(self, args, *popen_args, **popen_kwargs):
+            program = args[0] if isinstance(args, (list, tuple)) else str(args).split()[0]
+            if os.path.basename(str(program)).startswith(("ffmpeg", "ffprobe")):
+                spawns.append(program)
+            super().__init__(args, *popen_args, **popen_kwargs)
+
+    detections = []
+
+    def fake_detection(model, audio):
+        # Stands in for the log-mel step, which needs torch and Whisper
+        detections.append(len(audio))
+        _, probs = model.detect_language(audio)
+        return max(probs, key=probs.get)
+
+    # Transcribe one request at a time with a fixed language so the fake model
+    # sees plain transcribe calls rather than batched or single-mel decodes.
+    # Whisper itself need not be installed: the registry serves the fake model.
+    batcher = backend.whisper_batcher
+    whisper_available = backend.WHISPER_AVAILABLE
+    run_detection = backend.run_whisper_language_detection
+    backend.whisper_batcher = None
+    backend.WHISPER_AVAILABLE = True
+    backend.run_whisper_language_detection = fake_detection
+    backend.model_registry.register("whisper_base", FakeWhisperModel())
+    subprocess.Popen = CountingPopen
+    passed = True
+    try:
+        client = TestClient(backend.app)
+        for name, payload, expected in uploads:
+            for endpoint, data in (("/stt", {"lang": "en", "use_auto_detection": "false"}), ("/detect-language", None)):
+                spawns.clear()
+                detections.clear()
+                response = client.post(endpoint, files={"file": (name, payload)}, data=data)
+                ok = response.status_code == 200 and len(spawns) <= 1 and len(spawns) == expected
+                if endpoint == "/detect-language":
+                    # "hi" only comes from the fake model; a failed detection falls back to "en"
+                    ok = ok and len(detections) == 1 and response.json().get("detected_language") == "hi"
+                passed = passed and ok
+                print(f"  {'✓' if ok else '✗'} {endpoint} {name}: {len(spawns)} ffmpeg spawn(s), status {response.status_code}")
+    finally:
+        subprocess.Popen = real_popen
+        backend.model_registry.evict("whisper_base")
+        backend.whisper_batcher = batcher
+        backend.WHISPER_AVAILABLE = whisper_available
+        backend.run_whisper_language_detection = run_detection
+
+    if passed:
+        print("✓ Every request decoded its upload with at most one ffmpeg spawn")
+    return passed
+
+def test_tts_sentence_chunks():
+    """Check in-process that streaming TTS splits sentences only at real boundaries"""
+    print("\n✂️  Testing TTS sentence chunking...")
+    try:
+        import sys
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import app as backend
+    except ImportError as e:
+        print(f"⚠ In-process test dependencies missing ({e}), skipping")
+        return False
+
+    cases = [
+        ("Are you serious?!", "en", ["Are you serious?!"]),
+        ('He said "Hi!" and left.', "en", ['He said "Hi!"', "and left."]),
+        ("Really?! Yes", "en", ["Really?!", "Yes"]),
+        ("Wait (really!) now. Done", "en", ["Wait (really!)", "now.", "Done"]),
+        ("Hello. !!", "en", ["Hello. !!"]),
+        ('उसने कहा "रुको!" और चला गया।ठीक है', "hi", ['उसने कहा "रुको!"', "और चला गया।", "ठीक है"]),
+    ]
+    passed = True
+    for text, lang, expected in cases:
+        chunks = backend.split_tts_chunks(text, lang, min_chars=0)
+        ok = chunks == expected
+        passed = passed and ok
+        print(f"  {'✓' if ok else '✗'} {text!r} -> {chunks}")
+
+    if passed:
+        print("✓ Sentence chunks keep their punctuation and closing quotes")
+    return passed
+
 def cleanup():
     """Clean up test files"""
     if os.path.exists(TEST_AUDIO_FILE):
         os.remove(TEST_AUDIO_FILE)
         print(f"✓ Cleaned up {TEST_AUDIO_FILE}")
 
+def run_tests(tests, results):
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"✗ {test_name} crashed: {e}")
+            results.append((test_name, False))
+
 def main():
     """Run all tests"""
     print("🚀 Starting STT/TTS Backend Tests")
     print("=" * 50)
 
+    # In-process tests import app.py directly and need no server
+    results = []
+    run_tests([
+        ("ffmpeg Spawns Per Request", test_ffmpeg_spawns_per_request),
+        ("TTS Sentence Chunks", test_tts_sentence_chunks),
+    ], results)
+
     # Check if server is running
+    server_up = False
     try:
         response = requests.get(f"{BASE_URL}/health", timeout=5)
-        if response.status_code != 200:
-            print("❌ Backend server is not running or not responding")
+        server_up = response.status_code == 200
+        if not server_up:
+            print("\n❌ Backend server is not running or not responding")
             print(f"   Make sure the server is running on {BASE_URL}")
-            return
-    except:
-        print("❌ Cannot connect to backend server")
+    except Exception:
+        print("\n❌ Cannot connect to backend server, skipping the endpoint tests")
         print(f"   Make sure the server is running on {BASE_URL}")
         print("   Run: cd stt_tts && python app.py")
-        return
-
-    # Create test audio
-    audio_created = create_test_audio()
-
-    # Run tests
-    tests = [
-        ("Health Check", test_health_check),
-        ("Supported Languages", test_supported_languages),
-        ("Language Detection", test_language_detection),
-        ("Speech to Text", test_stt_endpoint),
-        ("Text to Speech", test_tts_endpoint),
-    ]
 
-    results = []
-    for test_name, test_func in tests:
-        try:
-            result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"✗ {test_name} crashed: {e}")
-            results.append((test_name, False))
+    if server_up:
+        # Create test audio
+        create_test_audio()
+        run_tests([
+            ("Health Check", test_health_check),
+            ("Supported Languages", test_supported_languages),
+            ("Language Detection", test_language_detection),
+            ("Speech to Text", test_stt_endpoint),
+            ("Text to Speech", test_tts_endpoint),
+        ], results)
 
     # Summary
     print("\n" + "=" * 50)
@@ -220,7 +354,9 @@ def main():
 
     print(f"\n🎯 Results: {passed}/{total} tests passed")
 
-    if passed == total:
+    if passed == total and not server_up:
+        print("⚠️  In-process tests passed; endpoint tests were skipped without a server.")
+    elif passed == total:
         print("🎉 All tests passed! Backend is ready.")
     else:
         print("⚠️  Some tests failed. Check the output above for details.")